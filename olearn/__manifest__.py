@@ -14,6 +14,8 @@ An online learning web made using Odoo framework.
         'security/security.xml',
         'security/record_rules.xml',
 
+        'data/ir_cron_data.xml',
+
         'reports/teacher/report_program_info_template.xml',
         'reports/teacher/report_program_info_action.xml',
 
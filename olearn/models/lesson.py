@@ -61,7 +61,8 @@ class Lesson(models.Model):
         string="Program",
         related="lesson_template_id.program_id",
         store=True,
-        readonly=True
+        readonly=True,
+        index=True
     )
 
     _sql_constraints = [
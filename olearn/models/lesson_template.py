@@ -1,4 +1,5 @@
 from odoo import fields, models, api
+from .utils import count_by_inverse, assign_counts
 
 
 class LessonTemplate(models.Model):
@@ -91,14 +92,14 @@ class LessonTemplate(models.Model):
     # Compute students who have this lesson
     @api.depends('lesson_ids')
     def _compute_student_count(self):
-        for template in self:
-            template.student_count = len(template.lesson_ids)
+        counts = count_by_inverse(self, 'olearn.lesson', 'lesson_template_id')
+        assign_counts(self, 'student_count', 'lesson_ids', counts)
 
     # Compute task template count when tasl_template_ids changes
     @api.depends('task_template_ids')
     def _compute_task_template_count(self):
-        for template in self:
-            template.task_template_count = len(template.task_template_ids)
+        counts = count_by_inverse(self, 'olearn.task.template', 'lesson_template_id')
+        assign_counts(self, 'task_template_count', 'task_template_ids', counts)
 
     # Publish lesson to students LOGIC
     def action_publish_to_students(self):
@@ -124,28 +125,34 @@ class LessonTemplate(models.Model):
 
         # Check if is_hidden was changed from True to False
         if 'is_hidden' in vals and not vals['is_hidden']:
-            for template in self:
-                template._create_lessons_for_students()
+            self._create_lessons_for_students()
 
         return result
 
-    # Create lesson records for all students who don't have it
+    # Create the missing lesson records of all templates for their enrolled students in one statement
     def _create_lessons_for_students(self):
-        self.ensure_one()
-
-        if not self.program_id or not self.program_id.student_ids:
+        templates = self.filtered('program_id')
+        if not templates:
             return
 
-        existing_student_ids = self.lesson_ids.mapped('student_id').ids
-        students_to_add = self.program_id.student_ids.filtered(
-            lambda s: s.id not in existing_student_ids
-        )
-
-        lesson_vals = [{
-            'lesson_template_id': self.id,
-            'student_id': student.id,
-            'is_viewed': False
-        } for student in students_to_add]
-
-        if lesson_vals:
-            self.env["olearn.lesson"].sudo().create(lesson_vals)
+        self.flush(['program_id', 'name'])
+        self.env['olearn.program'].flush(['student_ids'])
+        self.env['olearn.lesson'].flush(['lesson_template_id', 'student_id'])
+        self.env.cr.execute("""
+            INSERT INTO olearn_lesson
+                   (lesson_template_id, student_id, program_id, template_name, is_viewed,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT t.id, rel.user_id, t.program_id, t.name, FALSE,
+                   %(uid)s, %(now)s, %(uid)s, %(now)s
+              FROM olearn_lesson_template t
+              JOIN program_student_rel rel ON rel.program_id = t.program_id
+             WHERE t.id IN %(ids)s
+               AND NOT EXISTS (SELECT 1 FROM olearn_lesson l
+                                WHERE l.lesson_template_id = t.id AND l.student_id = rel.user_id)
+                ON CONFLICT (lesson_template_id, student_id) DO NOTHING
+        """, {'ids': tuple(templates.ids), 'uid': self.env.uid, 'now': fields.Datetime.now()})
+
+        if self.env.cr.rowcount:
+            self.env['olearn.lesson'].invalidate_cache()
+            templates.invalidate_cache(['lesson_ids'])
+            templates.modified(['lesson_ids'])
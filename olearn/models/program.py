@@ -1,4 +1,5 @@
 from odoo import fields, models, api, exceptions
+from .utils import count_by_inverse, assign_counts
 
 
 class Program(models.Model):
@@ -14,7 +15,8 @@ class Program(models.Model):
     status = fields.Boolean(
         string="Is the student in this class?",
         store=False,
-        compute="_compute_status"
+        compute="_compute_status",
+        search="_search_status"
     )
 
     # -------------- RELATIONS --------------
@@ -75,7 +77,7 @@ class Program(models.Model):
                     "Please contact your administrator to be assigned the student role."
                 )
 
-            if current_user.id in program.student_ids.ids:
+            if program.status:
                 return {
                     'type': 'ir.actions.client',
                     'tag': 'display_notification',
@@ -141,6 +143,82 @@ class Program(models.Model):
             'context': {'default_program_id': self.id},
         }
 
+    def action_export_gradebook(self):
+        self.ensure_one()
+        file_format = self.env.context.get('gradebook_format', 'csv')
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/olearn/program/{self.id}/gradebook.{file_format}',
+            'target': 'self',
+        }
+
+    # Header row, then one row per student with task scores/statuses and lesson viewed flags
+    def _iter_gradebook_rows(self, chunk_size=500):
+        """Yield the gradebook of the program row by row.
+
+        Students are read in keyset chunks of ``chunk_size`` and their records
+        are fetched per chunk, so memory does not grow with the program size.
+        """
+        self.ensure_one()
+        templates = self.env['olearn.task.template'].sudo().search([('program_id', '=', self.id)])
+        lesson_templates = self.env['olearn.lesson.template'].sudo().search([('program_id', '=', self.id)])
+        task_index = {template_id: index for index, template_id in enumerate(templates.ids)}
+        lesson_index = {template_id: index for index, template_id in enumerate(lesson_templates.ids)}
+        status_labels = dict(self.env['olearn.task']._fields['status'].selection)
+
+        header = ['Student']
+        for template in templates:
+            header += [f'{template.name} (Score)', f'{template.name} (Status)']
+        header += [f'{template.name} (Viewed)' for template in lesson_templates]
+        yield header
+
+        self.env['olearn.task'].flush(['program_id', 'task_template_id', 'student_id', 'score', 'status'])
+        self.env['olearn.lesson'].flush(['program_id', 'lesson_template_id', 'student_id', 'is_viewed'])
+        self.flush(['student_ids'])
+        cr = self.env.cr
+        last_student_id = 0
+        while True:
+            cr.execute("""
+                SELECT rel.user_id, p.name
+                  FROM program_student_rel rel
+                  JOIN res_users u ON u.id = rel.user_id
+                  JOIN res_partner p ON p.id = u.partner_id
+                 WHERE rel.program_id = %s AND rel.user_id > %s
+              ORDER BY rel.user_id
+                 LIMIT %s
+            """, (self.id, last_student_id, chunk_size))
+            students = cr.fetchall()
+            if not students:
+                return
+
+            student_ids = tuple(student_id for student_id, _name in students)
+            rows = {student_id: [name] + [''] * (2 * len(templates)) + ['No'] * len(lesson_templates)
+                    for student_id, name in students}
+
+            cr.execute("""
+                SELECT student_id, task_template_id, score, status
+                  FROM olearn_task
+                 WHERE program_id = %s AND student_id IN %s
+            """, (self.id, student_ids))
+            for student_id, template_id, score, status in cr.fetchall():
+                if template_id in task_index:
+                    column = 1 + 2 * task_index[template_id]
+                    rows[student_id][column] = score
+                    rows[student_id][column + 1] = status_labels.get(status, status)
+
+            cr.execute("""
+                SELECT student_id, lesson_template_id, is_viewed
+                  FROM olearn_lesson
+                 WHERE program_id = %s AND student_id IN %s
+            """, (self.id, student_ids))
+            for student_id, template_id, viewed in cr.fetchall():
+                if template_id in lesson_index:
+                    rows[student_id][1 + 2 * len(templates) + lesson_index[template_id]] = 'Yes' if viewed else 'No'
+
+            for student_id in student_ids:
+                yield rows[student_id]
+            last_student_id = student_ids[-1]
+
     def action_view_students(self):
         self.ensure_one()
         return {
@@ -152,21 +230,56 @@ class Program(models.Model):
             'context': {'default_groups_id': [(4, self.env.ref('olearn.group_student').id)]},
         }
 
-    # Check if current user is enrolled in this program
+    # Check if current user is enrolled in this program, with one query on the relation table
     @api.depends("student_ids")
+    @api.depends_context("uid")
     def _compute_status(self):
-        current_user = self.env.user.id
+        enrolled_ids = self._get_enrolled_program_ids(self._origin.ids)
         for program in self:
-            program.status = current_user in program.student_ids.ids
+            program.status = program._origin.id in enrolled_ids
+
+    def _search_status(self, operator, value):
+        if operator not in ('=', '!='):
+            raise exceptions.UserError(f"Unsupported operator {operator} for status.")
+        enrolled_ids = list(self._get_enrolled_program_ids())
+        return [('id', 'in' if (operator == '=') == bool(value) else 'not in', enrolled_ids)]
+
+    # Ids of the programs (among program_ids, or all) the current user is enrolled in
+    @api.model
+    def _get_enrolled_program_ids(self, program_ids=None):
+        if program_ids is not None and not program_ids:
+            return set()
+        self.flush(['student_ids'])
+        query = "SELECT program_id FROM program_student_rel WHERE user_id = %s"
+        params = [self.env.uid]
+        if program_ids is not None:
+            query += " AND program_id IN %s"
+            params.append(tuple(program_ids))
+        self.env.cr.execute(query, params)
+        return {row[0] for row in self.env.cr.fetchall()}
 
     # Compute lesson templates count in program
     @api.depends("lesson_template_ids")
     def _compute_lesson_count(self):
-        for program in self:
-            program.lesson_count = len(program.lesson_template_ids)
+        counts = count_by_inverse(self, 'olearn.lesson.template', 'program_id')
+        assign_counts(self, 'lesson_count', 'lesson_template_ids', counts)
 
     # Compute enrolled students count
     @api.depends("student_ids")
     def _compute_student_count(self):
-        for program in self:
-            program.student_count = len(program.student_ids)
+        assign_counts(self, 'student_count', 'student_ids', self._count_students())
+
+    # Number of active enrolled users per stored program, counted on the relation table
+    def _count_students(self):
+        ids = [record_id for record_id in self.ids if record_id]
+        if not ids:
+            return {}
+        self.flush(['student_ids'])
+        self.env.cr.execute("""
+            SELECT rel.program_id, COUNT(*)
+              FROM program_student_rel rel
+              JOIN res_users u ON u.id = rel.user_id
+             WHERE rel.program_id IN %s AND u.active
+          GROUP BY rel.program_id
+        """, (tuple(ids),))
+        return dict(self.env.cr.fetchall())
@@ -98,7 +98,8 @@ class Task(models.Model):
         string="Program",
         related="task_template_id.program_id",
         store=True,
-        readonly=True
+        readonly=True,
+        index=True
     )
 
     # -------------- COMPUTED FIELDS --------------
@@ -117,6 +118,39 @@ class Task(models.Model):
          'Score cannot be negative!')
     ]
 
+    def _auto_init(self):
+        res = super()._auto_init()
+        # Overdue cron: assigned tasks whose due date fell in a time window
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS olearn_task_due_assigned_index
+                ON olearn_task (template_due_date) WHERE status = 'assigned'
+        """)
+        return res
+
+    @api.model
+    def _cron_flag_overdue(self):
+        """Flag assigned tasks whose due date passed since the last run.
+
+        The overdue compute only runs when a task or its template is written,
+        so tasks silently going past their due date are caught here with one
+        range UPDATE instead of recomputing the whole table.
+        """
+        # The cron stamps lastcall itself once the run is over, no parameter to write
+        last_run = self.env.ref('olearn.ir_cron_flag_overdue_tasks').sudo().lastcall
+        now = fields.Datetime.now()
+
+        self.flush(['status', 'template_due_date', 'is_overdue'])
+        self.env.cr.execute("""
+            UPDATE olearn_task
+               SET is_overdue = TRUE
+             WHERE status = 'assigned'
+               AND template_due_date <= %s
+               AND (%s::timestamp IS NULL OR template_due_date > %s::timestamp)
+               AND is_overdue IS NOT TRUE
+        """, (now, last_run or None, last_run or None))
+        if self.env.cr.rowcount:
+            self.invalidate_cache(['is_overdue'])
+
     # Check if task is overdue
     @api.depends('template_due_date', 'status')
     def _compute_is_overdue(self):
@@ -1,5 +1,6 @@
 from odoo import fields, models, api
 from datetime import datetime, timedelta, time
+from .utils import count_by_inverse, assign_counts
 
 
 class TaskTemplate(models.Model):
@@ -91,8 +92,8 @@ class TaskTemplate(models.Model):
     # Count students who have this task
     @api.depends('task_ids')
     def _compute_student_count(self):
-        for template in self:
-            template.student_count = len(template.task_ids)
+        counts = count_by_inverse(self, 'olearn.task', 'task_template_id')
+        assign_counts(self, 'student_count', 'task_ids', counts)
 
     # Publish task to students
     def action_publish_to_students(self):
@@ -119,33 +120,39 @@ class TaskTemplate(models.Model):
         result = super().write(vals)
 
         if 'is_hidden' in vals and not vals['is_hidden']:
-            for template in self:
-                template._create_tasks_for_students()
+            self._create_tasks_for_students()
 
         return result
 
-    # Create task records for all enrolled students who don't have it yet
+    # Create the missing task records of all templates for their enrolled students in one statement
     def _create_tasks_for_students(self):
-        self.ensure_one()
-
-        if not self.program_id or not self.program_id.student_ids:
+        templates = self.filtered('program_id')
+        if not templates:
             return
 
-        existing_student_ids = self.task_ids.mapped('student_id').ids
-        students_to_add = self.program_id.student_ids.filtered(
-            lambda s: s.id not in existing_student_ids
-        )
-
-        task_vals = [{
-            'task_template_id': self.id,
-            'student_id': student.id,
-            'score': 0,
-            'status': 'assigned',
-            'is_submittable': True
-        } for student in students_to_add]
-
-        if task_vals:
-            self.env["olearn.task"].sudo().create(task_vals)
+        self.flush(['program_id', 'name', 'due_date', 'max_score'])
+        self.env['olearn.program'].flush(['student_ids'])
+        self.env['olearn.task'].flush(['task_template_id', 'student_id'])
+        self.env.cr.execute("""
+            INSERT INTO olearn_task
+                   (task_template_id, student_id, program_id, template_name, template_due_date,
+                    template_max_score, score, status, is_submittable, is_overdue,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT t.id, rel.user_id, t.program_id, t.name, t.due_date,
+                   t.max_score, 0, 'assigned', TRUE, COALESCE(t.due_date < %(now)s, FALSE),
+                   %(uid)s, %(now)s, %(uid)s, %(now)s
+              FROM olearn_task_template t
+              JOIN program_student_rel rel ON rel.program_id = t.program_id
+             WHERE t.id IN %(ids)s
+               AND NOT EXISTS (SELECT 1 FROM olearn_task k
+                                WHERE k.task_template_id = t.id AND k.student_id = rel.user_id)
+                ON CONFLICT (task_template_id, student_id) DO NOTHING
+        """, {'ids': tuple(templates.ids), 'uid': self.env.uid, 'now': fields.Datetime.now()})
+
+        if self.env.cr.rowcount:
+            self.env['olearn.task'].invalidate_cache()
+            templates.invalidate_cache(['task_ids'])
+            templates.modified(['task_ids'])
 
     # Clear lesson template when program changes and update domain
     @api.onchange('program_id')
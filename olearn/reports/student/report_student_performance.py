@@ -24,16 +24,31 @@ class ReportProgram(models.AbstractModel):
         total_score = 0
         total_max_score = 0
 
+        # Load the student's records of all programs once and index them by template
+        Lesson = self.env['olearn.lesson']
+        Task = self.env['olearn.task']
+        lessons = {
+            lesson.lesson_template_id.id: lesson
+            for lesson in Lesson.search([
+                ('program_id', 'in', programs.ids),
+                ('student_id', '=', student_id)
+            ])
+        }
+        tasks = {
+            task.task_template_id.id: task
+            for task in Task.search([
+                ('program_id', 'in', programs.ids),
+                ('student_id', '=', student_id)
+            ])
+        }
+
         for program in programs:
             lesson_templates = program.lesson_template_ids
             task_templates = program.task_template_ids
 
             lesson_data = []
             for lesson_template in lesson_templates:
-                lesson = self.env['olearn.lesson'].search([
-                    ('lesson_template_id', '=', lesson_template.id),
-                    ('student_id', '=', student_id)
-                ], limit=1)
+                lesson = lessons.get(lesson_template.id, Lesson)
 
                 is_viewed = lesson.is_viewed if lesson else False
 
@@ -49,10 +64,7 @@ class ReportProgram(models.AbstractModel):
 
             task_data = []
             for task_template in task_templates:
-                task = self.env['olearn.task'].search([
-                    ('task_template_id', '=', task_template.id),
-                    ('student_id', '=', student_id)
-                ], limit=1)
+                task = tasks.get(task_template.id, Task)
 
                 score = task.score if task else 0
                 max_score = task_template.max_score
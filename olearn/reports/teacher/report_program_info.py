@@ -13,69 +13,46 @@ class ReportProgramInfo(models.AbstractModel):
         for program in programs:
             lesson_templates = program.lesson_template_ids
             task_templates = program.task_template_ids
+            students = program.student_ids
+
+            lesson_views, student_views = self._get_lesson_view_counts(program, lesson_templates, students)
+            task_totals, student_totals = self._get_task_totals(program, task_templates, students)
 
             lesson_stats = []
             for lesson_template in lesson_templates:
-                viewed_count = len([
-                    lesson for lesson in lesson_template.lesson_ids
-                    if lesson.is_viewed and lesson.student_id in program.student_ids
-                ])
+                viewed_count = lesson_views.get(lesson_template.id, 0)
 
                 lesson_stats.append({
                     'template': lesson_template,
                     'viewed_count': viewed_count,
-                    'total_students': len(program.student_ids),
-                    'view_percentage': (viewed_count / len(program.student_ids) * 100) if len(
-                        program.student_ids) > 0 else 0
+                    'total_students': len(students),
+                    'view_percentage': (viewed_count / len(students) * 100) if len(
+                        students) > 0 else 0
                 })
 
             task_stats = []
             for task_template in task_templates:
-                completed_count = len([
-                    task for task in task_template.task_ids
-                    if task.status in ['completed', 'graded'] and task.student_id in program.student_ids
-                ])
-
-                tasks = [
-                    task for task in task_template.task_ids
-                    if task.student_id in program.student_ids and task.score > 0
-                ]
-                avg_score = sum(t.score for t in tasks) / len(tasks) if tasks else 0
+                totals = task_totals.get(task_template.id, {})
+                completed_count = totals.get('completed', 0)
+                avg_score = totals['scored_sum'] / totals['scored'] if totals.get('scored') else 0
 
                 task_stats.append({
                     'template': task_template,
                     'completed_count': completed_count,
-                    'total_students': len(program.student_ids),
-                    'completion_percentage': (completed_count / len(program.student_ids) * 100) if len(
-                        program.student_ids) > 0 else 0,
+                    'total_students': len(students),
+                    'completion_percentage': (completed_count / len(students) * 100) if len(
+                        students) > 0 else 0,
                     'average_score': avg_score,
                     'max_score': task_template.max_score
                 })
 
             student_stats = []
-            for student in program.student_ids:
-                lessons_viewed = len([
-                    lesson for lesson in self.env['olearn.lesson'].search([
-                        ('lesson_template_id', 'in', lesson_templates.ids),
-                        ('student_id', '=', student.id),
-                        ('is_viewed', '=', True)
-                    ])
-                ])
-
-                tasks_completed = len([
-                    task for task in self.env['olearn.task'].search([
-                        ('task_template_id', 'in', task_templates.ids),
-                        ('student_id', '=', student.id),
-                        ('status', 'in', ['completed', 'graded'])
-                    ])
-                ])
-
-                student_tasks = self.env['olearn.task'].search([
-                    ('task_template_id', 'in', task_templates.ids),
-                    ('student_id', '=', student.id)
-                ])
-                total_score = sum(task.score for task in student_tasks)
-                total_max_score = sum(task.task_template_id.max_score for task in student_tasks)
+            for student in students:
+                totals = student_totals.get(student.id, {})
+                lessons_viewed = student_views.get(student.id, 0)
+                tasks_completed = totals.get('completed', 0)
+                total_score = totals.get('score_sum', 0)
+                total_max_score = totals.get('max_score_sum', 0)
                 score_percentage = (total_score / total_max_score * 100) if total_max_score > 0 else 0
 
                 student_stats.append({
@@ -93,11 +70,11 @@ class ReportProgramInfo(models.AbstractModel):
                 })
 
             total_views = sum(stat['viewed_count'] for stat in lesson_stats)
-            total_possible_views = len(lesson_templates) * len(program.student_ids)
+            total_possible_views = len(lesson_templates) * len(students)
             overall_view_percentage = (total_views / total_possible_views * 100) if total_possible_views > 0 else 0
 
             total_completions = sum(stat['completed_count'] for stat in task_stats)
-            total_possible_completions = len(task_templates) * len(program.student_ids)
+            total_possible_completions = len(task_templates) * len(students)
             overall_completion_percentage = (
                     total_completions / total_possible_completions * 100) if total_possible_completions > 0 else 0
 
@@ -116,3 +93,65 @@ class ReportProgramInfo(models.AbstractModel):
             'docs': programs,
             'program_data': program_data,
         }
+
+    # Viewed lessons of enrolled students counted per template and per student in one query
+    def _get_lesson_view_counts(self, program, lesson_templates, students):
+        per_template, per_student = {}, {}
+        if not lesson_templates or not students:
+            return per_template, per_student
+
+        self.env['olearn.lesson'].flush(['program_id', 'lesson_template_id', 'student_id', 'is_viewed'])
+        self.env.cr.execute("""
+            SELECT lesson_template_id, student_id, COUNT(*)
+              FROM olearn_lesson
+             WHERE program_id = %s
+               AND lesson_template_id IN %s
+               AND student_id IN %s
+               AND is_viewed
+          GROUP BY GROUPING SETS ((lesson_template_id), (student_id))
+        """, (program.id, tuple(lesson_templates.ids), tuple(students.ids)))
+        for template_id, student_id, count in self.env.cr.fetchall():
+            if template_id is not None:
+                per_template[template_id] = count
+            else:
+                per_student[student_id] = count
+
+        return per_template, per_student
+
+    # Task completions and scores of enrolled students summed per template and per student in one query
+    def _get_task_totals(self, program, task_templates, students):
+        per_template, per_student = {}, {}
+        if not task_templates or not students:
+            return per_template, per_student
+
+        self.env['olearn.task'].flush(['program_id', 'task_template_id', 'student_id', 'status', 'score'])
+        self.env['olearn.task.template'].flush(['max_score'])
+        self.env.cr.execute("""
+            SELECT k.task_template_id,
+                   k.student_id,
+                   COUNT(*) FILTER (WHERE k.status IN ('completed', 'graded')),
+                   COUNT(*) FILTER (WHERE k.score > 0),
+                   COALESCE(SUM(k.score) FILTER (WHERE k.score > 0), 0),
+                   COALESCE(SUM(k.score), 0),
+                   COALESCE(SUM(t.max_score), 0)
+              FROM olearn_task k
+              JOIN olearn_task_template t ON t.id = k.task_template_id
+             WHERE k.program_id = %s
+               AND k.task_template_id IN %s
+               AND k.student_id IN %s
+          GROUP BY GROUPING SETS ((k.task_template_id), (k.student_id))
+        """, (program.id, tuple(task_templates.ids), tuple(students.ids)))
+        for template_id, student_id, completed, scored, scored_sum, score_sum, max_score_sum in self.env.cr.fetchall():
+            totals = {
+                'completed': completed,
+                'scored': scored,
+                'scored_sum': scored_sum,
+                'score_sum': score_sum,
+                'max_score_sum': max_score_sum,
+            }
+            if template_id is not None:
+                per_template[template_id] = totals
+            else:
+                per_student[student_id] = totals
+
+        return per_template, per_student
@@ -0,0 +1 @@
+from . import test_report_program_info
@@ -0,0 +1,223 @@
+import logging
+import time
+
+from odoo.tests.common import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+# Report values as computed before the grouped queries, walking every record in Python
+def _get_report_values_before(env, docids):
+    programs = env['olearn.program'].browse(docids)
+
+    program_data = []
+
+    for program in programs:
+        lesson_templates = program.lesson_template_ids
+        task_templates = program.task_template_ids
+
+        lesson_stats = []
+        for lesson_template in lesson_templates:
+            viewed_count = len([
+                lesson for lesson in lesson_template.lesson_ids
+                if lesson.is_viewed and lesson.student_id in program.student_ids
+            ])
+
+            lesson_stats.append({
+                'template': lesson_template,
+                'viewed_count': viewed_count,
+                'total_students': len(program.student_ids),
+                'view_percentage': (viewed_count / len(program.student_ids) * 100) if len(
+                    program.student_ids) > 0 else 0
+            })
+
+        task_stats = []
+        for task_template in task_templates:
+            completed_count = len([
+                task for task in task_template.task_ids
+                if task.status in ['completed', 'graded'] and task.student_id in program.student_ids
+            ])
+
+            tasks = [
+                task for task in task_template.task_ids
+                if task.student_id in program.student_ids and task.score > 0
+            ]
+            avg_score = sum(t.score for t in tasks) / len(tasks) if tasks else 0
+
+            task_stats.append({
+                'template': task_template,
+                'completed_count': completed_count,
+                'total_students': len(program.student_ids),
+                'completion_percentage': (completed_count / len(program.student_ids) * 100) if len(
+                    program.student_ids) > 0 else 0,
+                'average_score': avg_score,
+                'max_score': task_template.max_score
+            })
+
+        student_stats = []
+        for student in program.student_ids:
+            lessons_viewed = len([
+                lesson for lesson in env['olearn.lesson'].search([
+                    ('lesson_template_id', 'in', lesson_templates.ids),
+                    ('student_id', '=', student.id),
+                    ('is_viewed', '=', True)
+                ])
+            ])
+
+            tasks_completed = len([
+                task for task in env['olearn.task'].search([
+                    ('task_template_id', 'in', task_templates.ids),
+                    ('student_id', '=', student.id),
+                    ('status', 'in', ['completed', 'graded'])
+                ])
+            ])
+
+            student_tasks = env['olearn.task'].search([
+                ('task_template_id', 'in', task_templates.ids),
+                ('student_id', '=', student.id)
+            ])
+            total_score = sum(task.score for task in student_tasks)
+            total_max_score = sum(task.task_template_id.max_score for task in student_tasks)
+            score_percentage = (total_score / total_max_score * 100) if total_max_score > 0 else 0
+
+            student_stats.append({
+                'student': student,
+                'lessons_viewed': lessons_viewed,
+                'total_lessons': len(lesson_templates),
+                'lessons_percentage': (lessons_viewed / len(lesson_templates) * 100) if len(
+                    lesson_templates) > 0 else 0,
+                'tasks_completed': tasks_completed,
+                'total_tasks': len(task_templates),
+                'tasks_percentage': (tasks_completed / len(task_templates) * 100) if len(task_templates) > 0 else 0,
+                'total_score': total_score,
+                'total_max_score': total_max_score,
+                'score_percentage': score_percentage
+            })
+
+        total_views = sum(stat['viewed_count'] for stat in lesson_stats)
+        total_possible_views = len(lesson_templates) * len(program.student_ids)
+        overall_view_percentage = (total_views / total_possible_views * 100) if total_possible_views > 0 else 0
+
+        total_completions = sum(stat['completed_count'] for stat in task_stats)
+        total_possible_completions = len(task_templates) * len(program.student_ids)
+        overall_completion_percentage = (
+                total_completions / total_possible_completions * 100) if total_possible_completions > 0 else 0
+
+        program_data.append({
+            'program': program,
+            'lesson_stats': lesson_stats,
+            'task_stats': task_stats,
+            'student_stats': student_stats,
+            'overall_view_percentage': overall_view_percentage,
+            'overall_completion_percentage': overall_completion_percentage
+        })
+
+    return {
+        'doc_ids': docids,
+        'doc_model': 'olearn.program',
+        'docs': programs,
+        'program_data': program_data,
+    }
+
+
+class ReportProgramInfoCase(TransactionCase):
+
+    # A published program with lesson and task templates and their records for every student
+    @classmethod
+    def _seed_program(cls, student_count, template_count):
+        student_group = cls.env.ref('olearn.group_student')
+        teacher_group = cls.env.ref('olearn.group_teacher')
+        users = cls.env['res.users'].with_context(no_reset_password=True)
+
+        teacher = users.create({
+            'name': 'Program Teacher',
+            'login': 'program_report_teacher',
+            'groups_id': [(6, 0, [teacher_group.id])],
+        })
+        students = users.create([{
+            'name': f'Program Student {index}',
+            'login': f'program_report_student_{index}',
+            'groups_id': [(6, 0, [student_group.id])],
+        } for index in range(student_count)])
+        # Records of users who left the program must not be counted
+        outsider = users.create({
+            'name': 'Program Outsider',
+            'login': 'program_report_outsider',
+            'groups_id': [(6, 0, [student_group.id])],
+        })
+
+        program = cls.env['olearn.program'].create({
+            'name': 'Report Program',
+            'teacher_id': [(6, 0, teacher.ids)],
+            'student_ids': [(6, 0, (students | outsider).ids)],
+        })
+        cls.env['olearn.lesson.template'].create([{
+            'name': f'Lesson {index}',
+            'content': 'Content',
+            'program_id': program.id,
+            'is_hidden': False,
+        } for index in range(template_count)])
+        cls.env['olearn.task.template'].create([{
+            'name': f'Task {index}',
+            'program_id': program.id,
+            'max_score': 10 * (index + 1),
+            'is_hidden': False,
+        } for index in range(template_count)])
+        program.write({'student_ids': [(3, outsider.id)]})
+
+        lessons = cls.env['olearn.lesson'].search([('program_id', '=', program.id)])
+        lessons.filtered(lambda l: l.id % 2 == 0).write({'is_viewed': True})
+
+        tasks = cls.env['olearn.task'].search([('program_id', '=', program.id)])
+        for index, status in enumerate(['submitted', 'graded']):
+            tasks.filtered(lambda t: t.id % 3 == index + 1).write({'status': status})
+        for score in range(1, 7):
+            tasks.filtered(lambda t: t.id % 7 == score).write({'score': score})
+
+        return program
+
+
+@tagged('post_install', '-at_install')
+class TestReportProgramInfo(ReportProgramInfoCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls._seed_program(student_count=4, template_count=3)
+
+    def test_report_values_match_previous_implementation(self):
+        docids = self.program.ids
+        values = self.env['report.olearn.report_program_info_template']._get_report_values(docids)
+        self.assertEqual(values, _get_report_values_before(self.env, docids))
+
+
+# Opt-in: odoo-bin --test-tags olearn_benchmark
+@tagged('post_install', '-at_install', '-standard', 'olearn_benchmark')
+class BenchmarkReportProgramInfo(ReportProgramInfoCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls._seed_program(student_count=1000, template_count=10)
+
+    # Query count and wall time of one report run on a cold cache
+    def _measure(self, get_values):
+        self.env['olearn.program'].invalidate_cache()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        values = get_values()
+        return values, self.env.cr.sql_log_count - queries, time.perf_counter() - start
+
+    def test_benchmark_1000_students(self):
+        docids = self.program.ids
+        report = self.env['report.olearn.report_program_info_template']
+
+        before, before_queries, before_time = self._measure(lambda: _get_report_values_before(self.env, docids))
+        after, after_queries, after_time = self._measure(lambda: report._get_report_values(docids))
+
+        _logger.info(
+            "Program info report, 1000 students: before %s queries in %.3fs, after %s queries in %.3fs",
+            before_queries, before_time, after_queries, after_time,
+        )
+        self.assertEqual(after, before)
+        self.assertLess(after_queries, before_queries)
@@ -15,6 +15,8 @@ An online learning web made using Odoo framework.
         'security/security.xml',
         'security/record_rules.xml',
 
+        'data/ir_cron_data.xml',
+
         'reports/student/report_student_performance_action.xml',
         'reports/student/report_student_performance_template.xml',
         'reports/teacher/report_course_info_action.xml',
@@ -25,6 +27,8 @@ An online learning web made using Odoo framework.
         'views/task_views.xml',
         'views/lesson_record_views.xml',
         'views/task_record_views.xml',
+        'views/course_progress_views.xml',
+        'views/publish_job_views.xml',
 
         'views/main_menu.xml',
     ],
@@ -0,0 +1,79 @@
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+from werkzeug.exceptions import Forbidden, NotFound
+
+import odoo
+from odoo import api, http
+from odoo.http import request, content_disposition
+
+# Rows buffered before a CSV chunk is sent
+CSV_CHUNK_ROWS = 500
+XLSX_CHUNK_BYTES = 64 * 1024
+
+
+class GradebookController(http.Controller):
+
+    @http.route('/olearn2/course/<int:course_id>/gradebook.<string:file_format>', type='http', auth='user')
+    def course_gradebook(self, course_id, file_format):
+        if file_format not in ('csv', 'xlsx'):
+            raise NotFound()
+
+        course = request.env['olearn2.course'].browse(course_id).exists()
+        if not course:
+            raise NotFound()
+        if not request.env.user.has_group('olearn2.group_teacher'):
+            raise Forbidden()
+        course.check_access_rights('write')
+        course.check_access_rule('write')
+
+        rows = _iter_course_rows(request.db, request.env.uid, course.id)
+        if file_format == 'csv':
+            body = _iter_csv_chunks(rows)
+            content_type = 'text/csv;charset=utf-8'
+        else:
+            body = _iter_xlsx_chunks(rows)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+        return request.make_response(body, headers=[
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(f'{course.name} - Gradebook.{file_format}')),
+        ])
+
+
+# The request cursor is closed before the body is sent, the rows are read on a cursor of their own
+def _iter_course_rows(dbname, uid, course_id):
+    with odoo.registry(dbname).cursor() as cr:
+        env = api.Environment(cr, uid, {})
+        yield from env['olearn2.course'].browse(course_id)._iter_gradebook_rows()
+
+
+def _iter_csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# XLSX is a zip archive, rows are flushed to a temporary file and the file is streamed once closed
+def _iter_xlsx_chunks(rows):
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Gradebook')
+        bold = workbook.add_format({'bold': True})
+        for index, row in enumerate(rows):
+            worksheet.write_row(index, 0, row, bold if index == 0 else None)
+        workbook.close()
+
+        output.seek(0)
+        chunk = output.read(XLSX_CHUNK_BYTES)
+        while chunk:
+            yield chunk
+            chunk = output.read(XLSX_CHUNK_BYTES)
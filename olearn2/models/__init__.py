@@ -3,3 +3,5 @@ from . import lesson
 from . import task
 from . import lesson_record
 from . import task_record
+from . import course_progress
+from . import publish_job
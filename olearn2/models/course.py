@@ -1,4 +1,5 @@
 from odoo import fields, models, api, exceptions
+from .utils import count_by_inverse, assign_counts
 
 
 class Course(models.Model):
@@ -15,14 +16,37 @@ class Course(models.Model):
     joined = fields.Boolean(
         string="Is the student in this class?",
         store=False,
-        compute="_compute_joined"
+        compute="_compute_joined",
+        search="_search_joined"
     )
 
+    # Resolved with one query on the relation table instead of loading every student
     @api.depends("student_ids")
+    @api.depends_context("uid")
     def _compute_joined(self):
-        current_user = self.env.user.id
+        joined_ids = self._get_joined_course_ids(self._origin.ids)
         for course in self:
-            course.joined = current_user in course.student_ids.ids
+            course.joined = course._origin.id in joined_ids
+
+    def _search_joined(self, operator, value):
+        if operator not in ('=', '!='):
+            raise exceptions.UserError(f"Unsupported operator {operator} for Joined.")
+        joined_ids = list(self._get_joined_course_ids())
+        return [('id', 'in' if (operator == '=') == bool(value) else 'not in', joined_ids)]
+
+    # Ids of the courses (among course_ids, or all) the current user is enrolled in
+    @api.model
+    def _get_joined_course_ids(self, course_ids=None):
+        if course_ids is not None and not course_ids:
+            return set()
+        self.flush(['student_ids'])
+        query = "SELECT course_id FROM course_student_rel WHERE user_id = %s"
+        params = [self.env.uid]
+        if course_ids is not None:
+            query += " AND course_id IN %s"
+            params.append(tuple(course_ids))
+        self.env.cr.execute(query, params)
+        return {row[0] for row in self.env.cr.fetchall()}
 
     # -------------- RELATIONS --------------
     teacher_id = fields.Many2one(
@@ -65,8 +89,8 @@ class Course(models.Model):
     # Compute lesson templates count in program
     @api.depends("lesson_ids")
     def _compute_lesson_count(self):
-        for course in self:
-            course.lesson_count = len(course.lesson_ids)
+        counts = count_by_inverse(self, 'olearn2.lesson', 'course_id')
+        assign_counts(self, 'lesson_count', 'lesson_ids', counts)
 
     task_count = fields.Integer(
         string="Task Count",
@@ -76,8 +100,8 @@ class Course(models.Model):
 
     @api.depends("task_ids")
     def _compute_task_count(self):
-        for course in self:
-            course.task_count = len(course.task_ids)
+        counts = count_by_inverse(self, 'olearn2.task', 'course_id')
+        assign_counts(self, 'task_count', 'task_ids', counts)
 
     student_count = fields.Integer(
         string="Student Count",
@@ -88,8 +112,22 @@ class Course(models.Model):
     # Compute enrolled students count
     @api.depends("student_ids")
     def _compute_student_count(self):
-        for course in self:
-            course.student_count = len(course.student_ids)
+        assign_counts(self, 'student_count', 'student_ids', self._count_students())
+
+    # Number of active enrolled users per stored course, counted on the relation table
+    def _count_students(self):
+        ids = [record_id for record_id in self.ids if record_id]
+        if not ids:
+            return {}
+        self.flush(['student_ids'])
+        self.env.cr.execute("""
+            SELECT rel.course_id, COUNT(*)
+              FROM course_student_rel rel
+              JOIN res_users u ON u.id = rel.user_id
+             WHERE rel.course_id IN %s AND u.active
+          GROUP BY rel.course_id
+        """, (tuple(ids),))
+        return dict(self.env.cr.fetchall())
 
     cost = fields.Monetary(
         string="Cost for this Course",
@@ -104,6 +142,50 @@ class Course(models.Model):
         required=True
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        courses = super().create(vals_list)
+        self.env['olearn2.course.progress'].sudo()._refresh_courses(courses.filtered('student_ids').ids)
+        return courses
+
+    # Keep progress rows in step with enrollment, touching only the changed pairs
+    def write(self, vals):
+        if 'student_ids' not in vals:
+            return super().write(vals)
+
+        user_ids = self._get_enrollment_user_ids(vals['student_ids'])
+        enrolled_before = self._get_enrollment_pairs(user_ids)
+        result = super().write(vals)
+        enrolled_after = self._get_enrollment_pairs(user_ids)
+
+        progress = self.env['olearn2.course.progress'].sudo()
+        progress._remove(enrolled_before - enrolled_after)
+        progress._refresh(enrolled_after - enrolled_before)
+        return result
+
+    # Users referenced by student_ids commands, None when the commands may touch any enrollment
+    @api.model
+    def _get_enrollment_user_ids(self, commands):
+        user_ids = set()
+        for command in commands:
+            if not isinstance(command, (list, tuple)) or command[0] in (0, 5, 6):
+                return None
+            user_ids.add(command[1])
+        return user_ids
+
+    # Enrollment pairs of the courses, restricted to user_ids when given
+    def _get_enrollment_pairs(self, user_ids=None):
+        if not self or user_ids is not None and not user_ids:
+            return set()
+        self.flush(['student_ids'])
+        query = "SELECT course_id, user_id FROM course_student_rel WHERE course_id IN %s"
+        params = [tuple(self.ids)]
+        if user_ids is not None:
+            query += " AND user_id IN %s"
+            params.append(tuple(user_ids))
+        self.env.cr.execute(query, params)
+        return set(self.env.cr.fetchall())
+
     # Replace the join_course method in course.py:
 
     def join_course(self):
@@ -117,7 +199,7 @@ class Course(models.Model):
                     "Please contact your administrator to be assigned the student role."
                 )
 
-            if current_user.id in course.student_ids.ids:
+            if course.joined:
                 return {
                     'type': 'ir.actions.client',
                     'tag': 'display_notification',
@@ -130,9 +212,13 @@ class Course(models.Model):
                 }
 
             # FIXED: Use the new transaction method
-            result = self.env["owallet.transaction"].sudo().create_enrollment_transaction(
+            # The key of this enrollment keeps concurrent submits from charging twice
+            transaction_model = self.env["owallet.transaction"].sudo()
+            keys = transaction_model._get_enrollment_idempotency_keys(course, current_user)
+            result = transaction_model.create_enrollment_transaction(
                 student_user=current_user,
-                course=course
+                course=course,
+                idempotency_key=keys[current_user.id]
             )
 
             if not result:
@@ -194,6 +280,85 @@ class Course(models.Model):
                 }
             }
 
+    def enroll_students(self, user_ids):
+        """Enroll many students at once, charging and assigning them in bulk.
+
+        Returns {user_id: {'success': bool, 'message': str}} for every id given.
+        """
+        self.ensure_one()
+
+        # Enrolling charges other users' wallets, students may only join themselves
+        if not self.env.user.has_group('olearn2.group_teacher'):
+            raise exceptions.AccessError("Only teachers and managers can enroll students")
+        if not self.env.user.has_group('olearn2.group_manager') and self.sudo().teacher_id != self.env.user:
+            raise exceptions.AccessError("Teachers can only enroll students in their own courses")
+        self.check_access_rights('write')
+        self.check_access_rule('write')
+
+        results = {}
+        users = self.env['res.users'].browse(user_ids).exists()
+        for user_id in set(user_ids) - set(users.ids):
+            results[user_id] = {'success': False, 'message': 'User does not exist'}
+
+        student_group = self.env.ref('olearn2.group_student')
+        self.flush(['student_ids'])
+        self.env.cr.execute("""
+            SELECT user_id
+              FROM course_student_rel
+             WHERE course_id = %s AND user_id IN %s
+        """, (self.id, tuple(users.ids) or (0,)))
+        enrolled_ids = {row[0] for row in self.env.cr.fetchall()}
+
+        candidates = users.browse()
+        for user in users:
+            if student_group not in user.groups_id:
+                results[user.id] = {'success': False, 'message': 'Only students can join courses'}
+            elif user.id in enrolled_ids:
+                results[user.id] = {'success': False, 'message': 'Already enrolled in this course'}
+            else:
+                candidates |= user
+
+        transaction_model = self.env["owallet.transaction"].sudo()
+        charged, failed = transaction_model.create_enrollment_transactions(
+            student_users=candidates,
+            course=self,
+            idempotency_keys=transaction_model._get_enrollment_idempotency_keys(self, candidates)
+        )
+        for user_id, message in failed.items():
+            results[user_id] = {'success': False, 'message': message}
+
+        if not charged:
+            return results
+
+        course = self.sudo()
+        course.write({"student_ids": [(4, user_id) for user_id in charged.ids]})
+
+        visible_lessons = course.lesson_ids.filtered(lambda l: not l.hidden)
+        visible_tasks = course.task_ids.filtered(lambda t: not t.hidden)
+
+        lesson_record_vals = [{
+            'lesson_id': lesson.id,
+            'student_id': student_id,
+            'viewed': False
+        } for student_id in charged.ids for lesson in visible_lessons]
+        if lesson_record_vals:
+            self.env["olearn2.lesson.record"].sudo().create(lesson_record_vals)
+
+        task_record_vals = [{
+            'task_id': task.id,
+            'student_id': student_id,
+            'score': 0,
+            'status': 'assigned',
+            'submittable': True
+        } for student_id in charged.ids for task in visible_tasks]
+        if task_record_vals:
+            self.env["olearn2.task.record"].sudo().create(task_record_vals)
+
+        for user_id in charged.ids:
+            results[user_id] = {'success': True, 'message': 'Enrolled'}
+
+        return results
+
     def action_view_lessons(self):
         self.ensure_one()
         return {
@@ -205,6 +370,93 @@ class Course(models.Model):
             'context': {'default_course_id': self.id},
         }
 
+    def action_view_progress(self):
+        self.ensure_one()
+        return {
+            'name': f'Progress - {self.name}',
+            'type': 'ir.actions.act_window',
+            'res_model': 'olearn2.course.progress',
+            'view_mode': 'tree',
+            'domain': [('course_id', '=', self.id)],
+        }
+
+    def action_export_gradebook(self):
+        self.ensure_one()
+        file_format = self.env.context.get('gradebook_format', 'csv')
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/olearn2/course/{self.id}/gradebook.{file_format}',
+            'target': 'self',
+        }
+
+    # Header row, then one row per student with task scores/statuses and lesson viewed flags
+    def _iter_gradebook_rows(self, chunk_size=500):
+        """Yield the gradebook of the course row by row.
+
+        Students are read in keyset chunks of ``chunk_size`` and their records
+        are fetched per chunk, so memory does not grow with the course size.
+        """
+        self.ensure_one()
+        tasks = self.env['olearn2.task'].sudo().search([('course_id', '=', self.id)])
+        lessons = self.env['olearn2.lesson'].sudo().search([('course_id', '=', self.id)])
+        task_index = {task_id: index for index, task_id in enumerate(tasks.ids)}
+        lesson_index = {lesson_id: index for index, lesson_id in enumerate(lessons.ids)}
+        status_labels = dict(self.env['olearn2.task.record']._fields['status'].selection)
+
+        header = ['Student']
+        for task in tasks:
+            header += [f'{task.name} (Score)', f'{task.name} (Status)']
+        header += [f'{lesson.name} (Viewed)' for lesson in lessons]
+        yield header
+
+        self.env['olearn2.task.record'].flush(['course_id', 'task_id', 'student_id', 'score', 'status'])
+        self.env['olearn2.lesson.record'].flush(['lesson_id', 'student_id', 'viewed'])
+        self.flush(['student_ids'])
+        cr = self.env.cr
+        last_student_id = 0
+        while True:
+            cr.execute("""
+                SELECT rel.user_id, p.name
+                  FROM course_student_rel rel
+                  JOIN res_users u ON u.id = rel.user_id
+                  JOIN res_partner p ON p.id = u.partner_id
+                 WHERE rel.course_id = %s AND rel.user_id > %s
+              ORDER BY rel.user_id
+                 LIMIT %s
+            """, (self.id, last_student_id, chunk_size))
+            students = cr.fetchall()
+            if not students:
+                return
+
+            student_ids = tuple(student_id for student_id, _name in students)
+            rows = {student_id: [name] + [''] * (2 * len(tasks)) + ['No'] * len(lessons)
+                    for student_id, name in students}
+
+            cr.execute("""
+                SELECT student_id, task_id, score, status
+                  FROM olearn2_task_record
+                 WHERE course_id = %s AND student_id IN %s
+            """, (self.id, student_ids))
+            for student_id, task_id, score, status in cr.fetchall():
+                if task_id in task_index:
+                    column = 1 + 2 * task_index[task_id]
+                    rows[student_id][column] = score
+                    rows[student_id][column + 1] = status_labels.get(status, status)
+
+            cr.execute("""
+                SELECT r.student_id, r.lesson_id, r.viewed
+                  FROM olearn2_lesson_record r
+                  JOIN olearn2_lesson l ON l.id = r.lesson_id
+                 WHERE l.course_id = %s AND r.student_id IN %s
+            """, (self.id, student_ids))
+            for student_id, lesson_id, viewed in cr.fetchall():
+                if lesson_id in lesson_index:
+                    rows[student_id][1 + 2 * len(tasks) + lesson_index[lesson_id]] = 'Yes' if viewed else 'No'
+
+            for student_id in student_ids:
+                yield rows[student_id]
+            last_student_id = student_ids[-1]
+
     def action_view_students(self):
         self.ensure_one()
         return {
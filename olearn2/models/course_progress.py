@@ -0,0 +1,164 @@
+from odoo import fields, models, api
+
+# Columns rewritten by the progress queries
+PROGRESS_FIELDS = ['lessons_viewed', 'tasks_completed', 'score_sum', 'max_score_sum', 'last_activity']
+
+class CourseProgress(models.Model):
+    _name = "olearn2.course.progress"
+    _description = "Course progress per student"
+    _order = "course_id, student_id"
+    _rec_name = "student_id"
+    _log_access = False
+
+    # -------------- RELATIONS --------------
+    course_id = fields.Many2one(
+        comodel_name="olearn2.course",
+        string="Course",
+        required=True,
+        readonly=True,
+        ondelete="cascade",
+        index=True
+    )
+    student_id = fields.Many2one(
+        comodel_name="res.users",
+        string="Student",
+        required=True,
+        readonly=True,
+        ondelete="cascade",
+        index=True
+    )
+
+    # -------------- AGGREGATED FIELDS --------------
+    lessons_viewed = fields.Integer(
+        string="Lessons Viewed",
+        readonly=True
+    )
+    tasks_completed = fields.Integer(
+        string="Tasks Completed",
+        readonly=True
+    )
+    score_sum = fields.Integer(
+        string="Total Score",
+        readonly=True
+    )
+    max_score_sum = fields.Integer(
+        string="Total Max Score",
+        readonly=True
+    )
+    last_activity = fields.Datetime(
+        string="Last Activity",
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('unique_course_student',
+         'UNIQUE(course_id, student_id)',
+         'A student can only have one progress row per course!')
+    ]
+
+    # Recompute the rows of the given (course id, student id) pairs from their records
+    @api.model
+    def _refresh(self, pairs):
+        pairs = list({(course_id, student_id) for course_id, student_id in pairs if course_id and student_id})
+        if not pairs:
+            return
+
+        self.env['olearn2.lesson.record'].flush(['lesson_id', 'student_id', 'viewed', 'viewed_date'])
+        self.env['olearn2.task.record'].flush(
+            ['task_id', 'student_id', 'status', 'score', 'submission_date', 'graded_date']
+        )
+        self.env['olearn2.lesson'].flush(['course_id', 'hidden'])
+        self.env['olearn2.task'].flush(['course_id', 'hidden', 'active', 'max_score'])
+        self.env['olearn2.course'].flush(['student_ids'])
+        self.flush()
+
+        # Only enrolled students get a progress row
+        self.env.cr.execute("""
+            WITH pairs AS (
+                SELECT v.course_id, v.student_id
+                  FROM (VALUES {}) AS v (course_id, student_id)
+                  JOIN course_student_rel rel ON rel.course_id = v.course_id AND rel.user_id = v.student_id
+            ),
+            lesson_totals AS (
+                SELECT l.course_id, r.student_id,
+                       COUNT(*) FILTER (WHERE r.viewed) AS lessons_viewed,
+                       MAX(r.viewed_date) AS last_activity
+                  FROM olearn2_lesson_record r
+                  JOIN olearn2_lesson l ON l.id = r.lesson_id
+                  JOIN pairs p ON p.course_id = l.course_id AND p.student_id = r.student_id
+                 WHERE NOT l.hidden
+              GROUP BY l.course_id, r.student_id
+            ),
+            task_totals AS (
+                SELECT t.course_id, r.student_id,
+                       COUNT(*) FILTER (WHERE r.status IN ('completed', 'graded')) AS tasks_completed,
+                       SUM(r.score) AS score_sum,
+                       SUM(t.max_score) AS max_score_sum,
+                       GREATEST(MAX(r.submission_date), MAX(r.graded_date)) AS last_activity
+                  FROM olearn2_task_record r
+                  JOIN olearn2_task t ON t.id = r.task_id
+                  JOIN pairs p ON p.course_id = t.course_id AND p.student_id = r.student_id
+                 WHERE NOT t.hidden AND t.active
+              GROUP BY t.course_id, r.student_id
+            )
+            INSERT INTO olearn2_course_progress
+                   (course_id, student_id, lessons_viewed, tasks_completed,
+                    score_sum, max_score_sum, last_activity)
+            SELECT p.course_id, p.student_id,
+                   COALESCE(lt.lessons_viewed, 0),
+                   COALESCE(tt.tasks_completed, 0),
+                   COALESCE(tt.score_sum, 0),
+                   COALESCE(tt.max_score_sum, 0),
+                   GREATEST(lt.last_activity, tt.last_activity)
+              FROM pairs p
+         LEFT JOIN lesson_totals lt ON lt.course_id = p.course_id AND lt.student_id = p.student_id
+         LEFT JOIN task_totals tt ON tt.course_id = p.course_id AND tt.student_id = p.student_id
+                ON CONFLICT (course_id, student_id) DO UPDATE SET
+                   lessons_viewed = EXCLUDED.lessons_viewed,
+                   tasks_completed = EXCLUDED.tasks_completed,
+                   score_sum = EXCLUDED.score_sum,
+                   max_score_sum = EXCLUDED.max_score_sum,
+                   last_activity = EXCLUDED.last_activity
+         RETURNING id
+        """.format(', '.join(['(%s, %s)'] * len(pairs))),
+            [value for pair in pairs for value in pair])
+
+        self.invalidate_cache(PROGRESS_FIELDS, [row[0] for row in self.env.cr.fetchall()])
+
+    # Drop the rows of (course id, student id) pairs that are no longer enrolled
+    @api.model
+    def _remove(self, pairs):
+        pairs = list({(course_id, student_id) for course_id, student_id in pairs if course_id and student_id})
+        if not pairs:
+            return
+
+        self.flush()
+        self.env.cr.execute("""
+            DELETE FROM olearn2_course_progress cp
+             USING (VALUES {}) AS p (course_id, student_id)
+             WHERE cp.course_id = p.course_id AND cp.student_id = p.student_id
+         RETURNING cp.id
+        """.format(', '.join(['(%s, %s)'] * len(pairs))),
+            [value for pair in pairs for value in pair])
+        self.invalidate_cache(['course_id', 'student_id'] + PROGRESS_FIELDS, [row[0] for row in self.env.cr.fetchall()])
+
+    # Refresh every enrolled student of the courses and drop rows of students who left
+    @api.model
+    def _refresh_courses(self, course_ids):
+        if not course_ids:
+            return
+
+        self.env['olearn2.course'].flush(['student_ids'])
+        self.flush()
+        self.env.cr.execute("""
+            DELETE FROM olearn2_course_progress cp
+             WHERE cp.course_id IN %s
+               AND NOT EXISTS (SELECT 1
+                                 FROM course_student_rel rel
+                                WHERE rel.course_id = cp.course_id
+                                  AND rel.user_id = cp.student_id)
+        """, (tuple(course_ids),))
+        self.env.cr.execute("""
+            SELECT course_id, user_id FROM course_student_rel WHERE course_id IN %s
+        """, (tuple(course_ids),))
+        self._refresh(self.env.cr.fetchall())
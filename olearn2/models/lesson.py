@@ -1,4 +1,5 @@
 from odoo import fields, models, api
+from .utils import count_by_inverse, assign_counts
 
 
 class Lesson(models.Model):
@@ -52,8 +53,8 @@ class Lesson(models.Model):
     # Compute task template count when tasl_template_ids changes
     @api.depends('task_ids')
     def _compute_task_count(self):
-        for task in self:
-            task.task_count = len(task.task_ids)
+        counts = count_by_inverse(self, 'olearn2.task', 'lesson_id')
+        assign_counts(self, 'task_count', 'task_ids', counts)
 
     # -------------- RELATIONS --------------
     course_id = fields.Many2one(
@@ -80,49 +81,60 @@ class Lesson(models.Model):
     # Publish lesson to students LOGIC
     def action_publish_to_students(self):
         self.write({'hidden': False})
-        return True
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Publishing',
+                'message': 'Students will receive the lesson shortly.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
 
     def action_hide_from_students(self):
         self.write({'hidden': True})
         return True
 
-    # When creating a lesson template, assign to enrolled students if is_hidden=False
+    # When creating a lesson template, queue it for enrolled students if is_hidden=False
     @api.model
     def create(self, vals):
         lesson = super().create(vals)
 
-        if not lesson.hidden and lesson.course_id:
-            lesson._create_lesson_records_for_students()
+        self.env['olearn2.publish.job']._enqueue(lessons=lesson)
         return lesson
 
-    # When unhiding a lesson template, create lessons record for all students
+    # When unhiding a lesson template, queue lesson records for all students
     def write(self, vals):
+        pairs = self._get_progress_pairs() if 'course_id' in vals else []
         result = super().write(vals)
 
         # Check if is_hidden was changed from True to False
         if 'hidden' in vals and not vals['hidden']:
-            for lesson in self:
-                lesson._create_lesson_records_for_students()
-
-        return result
+            self.env['olearn2.publish.job']._enqueue(lessons=self)
 
-    # Create lesson records for all students who don't have it
-    def _create_lesson_records_for_students(self):
-        self.ensure_one()
+        # Visibility decides which records count towards course progress
+        if 'hidden' in vals or 'course_id' in vals:
+            self.env['olearn2.course.progress'].sudo()._refresh(pairs + self._get_progress_pairs())
 
-        if not self.course_id or not self.course_id.student_ids:
-            return
-
-        existing_student_ids = self.lesson_record_ids.mapped('student_id').ids
-        students_to_add = self.course_id.student_ids.filtered(
-            lambda s: s.id not in existing_student_ids
-        )
+        return result
 
-        lesson_record_vals = [{
-            'lesson_id': self.id,
-            'student_id': student.id,
-            'viewed': False
-        } for student in students_to_add]
+    def unlink(self):
+        pairs = self._get_progress_pairs()
+        result = super().unlink()
+        self.env['olearn2.course.progress'].sudo()._refresh(pairs)
+        return result
 
-        if lesson_record_vals:
-            self.env["olearn2.lesson.record"].sudo().create(lesson_record_vals)
+    # (course id, student id) pairs with a record on these lessons, only their progress can change
+    def _get_progress_pairs(self):
+        if not self:
+            return []
+        self.env['olearn2.lesson.record'].flush(['lesson_id', 'student_id'])
+        self.flush(['course_id'])
+        self.env.cr.execute("""
+            SELECT DISTINCT l.course_id, r.student_id
+              FROM olearn2_lesson_record r
+              JOIN olearn2_lesson l ON l.id = r.lesson_id
+             WHERE r.lesson_id IN %s
+        """, (tuple(self.ids),))
+        return self.env.cr.fetchall()
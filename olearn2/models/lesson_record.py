@@ -73,14 +73,70 @@ class LessonRecord(models.Model):
             'tag': 'reload',
         }
 
-    # Prevent duplicate lessons for same student
+    # Prevent duplicate lessons for same student, the existing record is returned instead
+    @api.model_create_multi
+    def create(self, vals_list):
+        keys = [(vals.get('lesson_id'), vals.get('student_id')) for vals in vals_list]
+        record_ids = self._get_existing_record_ids([key for key in keys if all(key)])
+
+        new_vals_list = []
+        for key, vals in zip(keys, vals_list):
+            if all(key) and key in record_ids:
+                continue
+            if all(key):
+                # Later duplicates inside the batch resolve to this record
+                record_ids[key] = None
+            new_vals_list.append(vals)
+
+        new_records = super().create(new_vals_list) if new_vals_list else self.browse()
+        new_records._refresh_course_progress()
+
+        new_ids = iter(new_records.ids)
+        result_ids = []
+        for key in keys:
+            if all(key) and record_ids[key]:
+                result_ids.append(record_ids[key])
+                continue
+            record_id = next(new_ids)
+            if all(key):
+                record_ids[key] = record_id
+            result_ids.append(record_id)
+        return self.browse(result_ids)
+
+    # Map (lesson id, student id) pairs to the ids of their existing records
     @api.model
-    def create(self, vals):
-        if 'lesson_id' in vals and 'student_id' in vals:
-            existing = self.search([
-                ('lesson_id', '=', vals['lesson_id']),
-                ('student_id', '=', vals['student_id'])
-            ], limit=1)
-            if existing:
-                return existing
-        return super().create(vals)
+    def _get_existing_record_ids(self, keys):
+        keys = list(set(keys))
+        if not keys:
+            return {}
+
+        self.flush(['lesson_id', 'student_id'])
+        self.env.cr.execute("""
+            SELECT r.lesson_id, r.student_id, r.id
+              FROM olearn2_lesson_record r
+              JOIN (VALUES {}) AS v (lesson_id, student_id)
+                ON v.lesson_id = r.lesson_id AND v.student_id = r.student_id
+        """.format(', '.join(['(%s, %s)'] * len(keys))),
+            [value for key in keys for value in key])
+        return {(lesson_id, student_id): record_id for lesson_id, student_id, record_id in self.env.cr.fetchall()}
+
+    def write(self, vals):
+        # Moving a record also changes the progress of the pair it leaves
+        pairs = self._get_progress_pairs() if {'lesson_id', 'student_id'} & set(vals) else []
+        result = super().write(vals)
+        if {'viewed', 'viewed_date', 'lesson_id', 'student_id'} & set(vals):
+            self.env['olearn2.course.progress'].sudo()._refresh(pairs + self._get_progress_pairs())
+        return result
+
+    def unlink(self):
+        pairs = self._get_progress_pairs()
+        result = super().unlink()
+        self.env['olearn2.course.progress'].sudo()._refresh(pairs)
+        return result
+
+    def _get_progress_pairs(self):
+        return [(record.lesson_id.course_id.id, record.student_id.id) for record in self.sudo()]
+
+    # Update the stored course progress of the affected students
+    def _refresh_course_progress(self):
+        self.env['olearn2.course.progress'].sudo()._refresh(self._get_progress_pairs())
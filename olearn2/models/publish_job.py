@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+
+from odoo import fields, models, api
+
+_logger = logging.getLogger(__name__)
+
+
+class PublishJob(models.Model):
+    _name = "olearn2.publish.job"
+    _description = "Publish lesson/task to students job"
+    _order = "id desc"
+    _rec_name = "name"
+
+    # -------------- BASIC FIELDS --------------
+    name = fields.Char(
+        string="Name",
+        compute="_compute_name"
+    )
+    state = fields.Selection(
+        [
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="Status",
+        default="queued",
+        required=True,
+        readonly=True,
+        index=True
+    )
+    total_count = fields.Integer(
+        string="Students",
+        readonly=True
+    )
+    done_count = fields.Integer(
+        string="Assigned",
+        readonly=True
+    )
+    progress = fields.Float(
+        string="Progress",
+        compute="_compute_progress"
+    )
+    error_message = fields.Text(
+        string="Error",
+        readonly=True
+    )
+
+    # -------------- RELATIONS --------------
+    course_id = fields.Many2one(
+        comodel_name="olearn2.course",
+        string="Course",
+        required=True,
+        readonly=True,
+        ondelete="cascade",
+        index=True
+    )
+    lesson_id = fields.Many2one(
+        comodel_name="olearn2.lesson",
+        string="Lesson",
+        readonly=True,
+        ondelete="cascade"
+    )
+    task_id = fields.Many2one(
+        comodel_name="olearn2.task",
+        string="Task",
+        readonly=True,
+        ondelete="cascade"
+    )
+
+    @api.depends('lesson_id', 'task_id')
+    def _compute_name(self):
+        for job in self:
+            job.name = job.lesson_id.name or job.task_id.name
+
+    @api.depends('total_count', 'done_count', 'state')
+    def _compute_progress(self):
+        for job in self:
+            if job.state == 'done':
+                job.progress = 100.0
+            elif job.total_count:
+                job.progress = 100.0 * job.done_count / job.total_count
+            else:
+                job.progress = 0.0
+
+    # Queue the records of the given lessons/tasks for every enrolled student
+    @api.model
+    def _enqueue(self, lessons=None, tasks=None):
+        lessons = (lessons or self.env['olearn2.lesson']).filtered(lambda l: not l.hidden and l.course_id)
+        tasks = (tasks or self.env['olearn2.task']).filtered(lambda t: not t.hidden and t.course_id)
+        if not lessons and not tasks:
+            return self.browse()
+
+        # A job still waiting for the same lesson/task covers this publish as well
+        pending = self.sudo().search([('state', 'in', ['queued', 'running']),
+                                      '|', ('lesson_id', 'in', lessons.ids), ('task_id', 'in', tasks.ids)])
+        vals_list = [{
+            'course_id': lesson.course_id.id,
+            'lesson_id': lesson.id,
+        } for lesson in lessons - pending.mapped('lesson_id')]
+        vals_list += [{
+            'course_id': task.course_id.id,
+            'task_id': task.id,
+        } for task in tasks - pending.mapped('task_id')]
+
+        jobs = self.sudo().create(vals_list)
+        self.env.ref('olearn2.ir_cron_process_publish_jobs').sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Assign queued lessons/tasks to students in chunks.
+
+        Each chunk is committed on its own, so a crash only loses the chunk in
+        progress and the unique constraints make replaying it harmless. When
+        the time budget runs out the cron re-triggers itself so the remaining
+        work is picked up by the next free worker.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(params.get_param('olearn2.publish_chunk_size', 500))
+        time_limit = int(params.get_param('olearn2.publish_time_limit', 60))
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        deadline = time.monotonic() + time_limit
+
+        for job in self.search([('state', 'in', ['queued', 'running'])], order='id'):
+            try:
+                while not job._process_chunk(chunk_size):
+                    if auto_commit:
+                        self.env.cr.commit()
+                    if time.monotonic() > deadline:
+                        self.env.ref('olearn2.ir_cron_process_publish_jobs')._trigger()
+                        return
+            except Exception as e:
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                _logger.exception("Publish job %s failed", job.id)
+                job.write({'state': 'failed', 'error_message': str(e)})
+            if auto_commit:
+                self.env.cr.commit()
+
+    # Create the next chunk of missing records, returns True once the job is finished
+    def _process_chunk(self, chunk_size):
+        self.ensure_one()
+
+        # Hiding the lesson/task again before the job ran cancels it
+        target = self.lesson_id or self.task_id
+        if not target or target.hidden:
+            self.write({'state': 'done'})
+            return True
+
+        if self.state == 'queued':
+            self.write({'state': 'running', 'total_count': self._count_missing_students()})
+
+        chunk = self._get_missing_student_ids(limit=chunk_size)
+        if chunk:
+            if self.lesson_id:
+                self.env['olearn2.lesson.record'].create([{
+                    'lesson_id': self.lesson_id.id,
+                    'student_id': student_id,
+                    'viewed': False
+                } for student_id in chunk])
+            else:
+                self.env['olearn2.task.record'].create([{
+                    'task_id': self.task_id.id,
+                    'student_id': student_id,
+                    'score': 0,
+                    'status': 'assigned',
+                    'submittable': True
+                } for student_id in chunk])
+
+        if len(chunk) < chunk_size:
+            self.write({'state': 'done', 'done_count': self.total_count})
+            return True
+
+        self.write({'done_count': min(self.done_count + len(chunk), self.total_count)})
+        return False
+
+    # Enrolled students of the course that have no record for the job's lesson/task yet
+    def _get_missing_student_ids(self, limit=None):
+        query, params = self._get_missing_students_query()
+        self.env.cr.execute("""
+            SELECT rel.user_id {query} ORDER BY rel.user_id LIMIT %s
+        """.format(query=query), params + [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    # Size of the job, counted once when it starts
+    def _count_missing_students(self):
+        query, params = self._get_missing_students_query()
+        self.env.cr.execute("SELECT COUNT(*) {query}".format(query=query), params)
+        return self.env.cr.fetchone()[0]
+
+    # FROM/WHERE clause shared by the missing students queries, with its parameters
+    def _get_missing_students_query(self):
+        self.env['olearn2.course'].flush(['student_ids'])
+        if self.lesson_id:
+            self.env['olearn2.lesson.record'].flush(['lesson_id', 'student_id'])
+            table, column, target_id = 'olearn2_lesson_record', 'lesson_id', self.lesson_id.id
+        else:
+            self.env['olearn2.task.record'].flush(['task_id', 'student_id'])
+            table, column, target_id = 'olearn2_task_record', 'task_id', self.task_id.id
+
+        query = """
+              FROM course_student_rel rel
+             WHERE rel.course_id = %s
+               AND NOT EXISTS (SELECT 1 FROM {table} r
+                                WHERE r.{column} = %s AND r.student_id = rel.user_id)
+        """.format(table=table, column=column)
+        return query, [self.course_id.id, target_id]
@@ -74,84 +74,99 @@ class Task(models.Model):
     # -------------- COMPUTED FIELDS --------------
     assigned_count = fields.Integer(
         string="Students Assigned",
-        compute="_compute_assigned_count",
-        store=False
+        compute="_compute_record_counts",
+        store=True
     )
-
-    # Count students who have this task
-    @api.depends('task_record_ids')
-    def _compute_assigned_count(self):
-        for task in self:
-            task.assigned_count = len(task.task_record_ids)
-
     completed_count = fields.Integer(
         string="Students Completed",
-        compute="_compute_completed_count",
-        store=False
+        compute="_compute_record_counts",
+        store=True
     )
 
-    # Count students who have this task
-    @api.depends('task_record_ids')
-    def _compute_completed_count(self):
-        for task in self:
-            task.completed_count = len(
-                task.task_record_ids.filtered(
-                    lambda r: r.status == 'graded'
-                )
+    # Count students who have / completed this task, one grouped query for the whole batch
+    @api.depends('task_record_ids', 'task_record_ids.status')
+    def _compute_record_counts(self):
+        ids = [task_id for task_id in self.ids if task_id]
+        assigned, completed = {}, {}
+        if ids:
+            groups = self.env['olearn2.task.record'].read_group(
+                [('task_id', 'in', ids)], ['task_id', 'status'], ['task_id', 'status'], lazy=False
             )
+            for group in groups:
+                task_id = group['task_id'][0]
+                assigned[task_id] = assigned.get(task_id, 0) + group['__count']
+                if group['status'] == 'graded':
+                    completed[task_id] = group['__count']
+
+        for task in self:
+            if task.id:
+                task.assigned_count = assigned.get(task.id, 0)
+                task.completed_count = completed.get(task.id, 0)
+            else:
+                task.assigned_count = len(task.task_record_ids)
+                task.completed_count = len(task.task_record_ids.filtered(lambda r: r.status == 'graded'))
 
     # Publish task to students
     def action_publish_to_students(self):
         self.write({'hidden': False})
-        return True
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Publishing',
+                'message': 'Students will receive the task shortly.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
 
     # Hide task from students
     def action_hide_from_students(self):
         self.write({'hidden': True})
         return True
 
-    # When creating a task template, assign to enrolled students if is_hidden=False
+    # When creating a task template, queue it for enrolled students if is_hidden=False
     @api.model
     def create(self, vals):
         task = super().create(vals)
 
-        if not task.hidden and task.course_id:
-            task._create_task_records_for_students()
+        self.env['olearn2.publish.job']._enqueue(tasks=task)
 
         return task
 
-    # When unhiding a task template, create tasks for all students
+    # When unhiding a task template, queue tasks for all students
     def write(self, vals):
+        pairs = self._get_progress_pairs() if 'course_id' in vals else []
         result = super().write(vals)
 
         if 'hidden' in vals and not vals['hidden']:
-            for task in self:
-                task._create_task_records_for_students()
-
-        return result
-
-    # Create task records for all enrolled students who don't have it yet
-    def _create_task_records_for_students(self):
-        self.ensure_one()
+            self.env['olearn2.publish.job']._enqueue(tasks=self)
 
-        if not self.course_id or not self.course_id.student_ids:
-            return
+        # These decide which records and max scores count towards course progress
+        if {'hidden', 'active', 'max_score', 'course_id'} & set(vals):
+            self.env['olearn2.course.progress'].sudo()._refresh(pairs + self._get_progress_pairs())
 
-        existing_student_ids = self.task_record_ids.mapped('student_id').ids
-        students_to_add = self.course_id.student_ids.filtered(
-            lambda s: s.id not in existing_student_ids
-        )
+        return result
 
-        task_record_vals = [{
-            'task_id': self.id,
-            'student_id': student.id,
-            'score': 0,
-            'status': 'assigned',
-            'submittable': True
-        } for student in students_to_add]
+    def unlink(self):
+        pairs = self._get_progress_pairs()
+        result = super().unlink()
+        self.env['olearn2.course.progress'].sudo()._refresh(pairs)
+        return result
 
-        if task_record_vals:
-            self.env["olearn2.task.record"].sudo().create(task_record_vals)
+    # (course id, student id) pairs with a record on these tasks, only their progress can change
+    def _get_progress_pairs(self):
+        if not self:
+            return []
+        self.env['olearn2.task.record'].flush(['task_id', 'student_id'])
+        self.flush(['course_id'])
+        self.env.cr.execute("""
+            SELECT DISTINCT t.course_id, r.student_id
+              FROM olearn2_task_record r
+              JOIN olearn2_task t ON t.id = r.task_id
+             WHERE r.task_id IN %s
+        """, (tuple(self.ids),))
+        return self.env.cr.fetchall()
 
     # Clear lesson template when program changes and update domain
     @api.onchange('course_id')
@@ -1,4 +1,4 @@
-from odoo import api, fields, models, exceptions
+from odoo import api, fields, models, exceptions, tools
 
 
 class TaskRecord(models.Model):
@@ -67,17 +67,26 @@ class TaskRecord(models.Model):
         readonly=True,
         store=False
     )
+
+    # Stored copies of the task so per-course and overdue queries skip the join
     task_due_date = fields.Datetime(
         string="Due Date",
         related="task_id.due_date",
         readonly=True,
-        store=False
+        store=True
     )
     task_max_score = fields.Integer(
         string="Max Score",
         related="task_id.max_score",
         readonly=True,
-        store=False
+        store=True
+    )
+    course_id = fields.Many2one(
+        comodel_name="olearn2.course",
+        string="Course",
+        related="task_id.course_id",
+        readonly=True,
+        store=True
     )
 
     # -------------- RELATIONS --------------
@@ -112,14 +121,70 @@ class TaskRecord(models.Model):
          'Score cannot be negative!')
     ]
 
+    def _auto_init(self):
+        # Fill the denormalized task columns in one statement instead of an ORM recompute
+        cr = self.env.cr
+        backfill = tools.table_exists(cr, self._table) and not tools.column_exists(cr, self._table, 'course_id')
+        if backfill:
+            tools.create_column(cr, self._table, 'course_id', 'int4')
+            tools.create_column(cr, self._table, 'task_due_date', 'timestamp')
+            tools.create_column(cr, self._table, 'task_max_score', 'int4')
+            cr.execute("""
+                UPDATE olearn2_task_record r
+                   SET course_id = t.course_id,
+                       task_due_date = t.due_date,
+                       task_max_score = t.max_score
+                  FROM olearn2_task t
+                 WHERE t.id = r.task_id
+            """)
+        res = super()._auto_init()
+        # Gradebook: all records of a course, one student at a time
+        tools.create_index(cr, 'olearn2_task_record_course_student_index',
+                           self._table, ['course_id', 'student_id'])
+        # "Overdue in course X": only still assigned records can be overdue
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS olearn2_task_record_course_due_assigned_index
+                ON olearn2_task_record (course_id, task_due_date) WHERE status = 'assigned'
+        """)
+        # Overdue cron: assigned records whose due date fell in a time window
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS olearn2_task_record_due_assigned_index
+                ON olearn2_task_record (task_due_date) WHERE status = 'assigned'
+        """)
+        return res
+
+    @api.model
+    def _cron_flag_overdue(self):
+        """Flag assigned records whose due date passed since the last run.
+
+        The overdue compute only runs when a record or its task is written,
+        so records silently going past their due date are caught here with
+        one range UPDATE instead of recomputing the whole table.
+        """
+        # The cron stamps lastcall itself once the run is over, no parameter to write
+        last_run = self.env.ref('olearn2.ir_cron_flag_overdue_task_records').sudo().lastcall
+        now = fields.Datetime.now()
+
+        self.flush(['status', 'task_due_date', 'overdue'])
+        self.env.cr.execute("""
+            UPDATE olearn2_task_record
+               SET overdue = TRUE
+             WHERE status = 'assigned'
+               AND task_due_date <= %s
+               AND (%s::timestamp IS NULL OR task_due_date > %s::timestamp)
+               AND overdue IS NOT TRUE
+        """, (now, last_run or None, last_run or None))
+        if self.env.cr.rowcount:
+            self.invalidate_cache(['overdue'])
+
     # Check if task is overdue
-    @api.depends('status', 'task_id.due_date')
+    @api.depends('status', 'task_due_date')
     def _compute_overdue(self):
         now = fields.Datetime.now()
         for record in self:
             record.overdue = (
-                    record.task_id.due_date and
-                    record.task_id.due_date < now and
+                    record.task_due_date and
+                    record.task_due_date < now and
                     record.status == 'assigned'
             )
 
@@ -168,42 +233,176 @@ class TaskRecord(models.Model):
 
     # Action for teacher returns graded task to student
     def action_return_to_student(self):
-        for task in self:
-            if task.status != 'submitted':
-                continue
-
-            task.write({
-                'status': 'returned',
-                'graded_date': fields.Datetime.now()
-            })
+        self.filtered(lambda task: task.status == 'submitted').write({
+            'status': 'returned',
+            'graded_date': fields.Datetime.now()
+        })
 
     def action_mark_as_done(self):
-        for task in self:
-            if task.status != 'submitted':
+        self.filtered(lambda task: task.status == 'submitted').write({
+            'status': 'graded',
+            'graded_date': fields.Datetime.now()
+        })
+
+    @api.model
+    def bulk_grade(self, grades):
+        """Grade many task records in one call.
+
+        :param grades: list of dicts with ``id`` and any of ``score``,
+            ``note`` and ``status`` ('graded' or 'returned'); missing keys
+            leave the value unchanged
+        :return: dict with the ``updated`` record ids and the ``errors`` as a
+            list of ``{'id', 'message'}`` dicts; rows with an error are not
+            written
+        """
+        # Students have write access on their own records, grading is for teachers only
+        if not self.env.user.has_group('olearn2.group_teacher'):
+            raise exceptions.AccessError("Only teachers and managers can grade tasks")
+
+        errors = []
+        rows = {}
+        for grade in grades:
+            record_id = grade.get('id')
+            if not isinstance(record_id, int) or isinstance(record_id, bool):
+                errors.append({'id': record_id, 'message': "Invalid record id."})
+            elif record_id in rows:
+                errors.append({'id': record_id, 'message': "Record is graded twice in the same request."})
+            else:
+                rows[record_id] = grade
+
+        self.check_access_rights('write')
+        records = self.browse(list(rows)).exists()
+        allowed = records._filter_access_rules('write')
+        for record_id in set(rows) - set(records.ids):
+            errors.append({'id': record_id, 'message': "Record does not exist."})
+        for record_id in set(records.ids) - set(allowed.ids):
+            errors.append({'id': record_id, 'message': "You are not allowed to grade this record."})
+
+        # One read for every status and max score
+        values = []
+        for record in allowed:
+            grade = rows[record.id]
+            score = grade.get('score')
+            status = grade.get('status')
+            message = None
+            if score is not None and (not isinstance(score, int) or isinstance(score, bool) or score < 0):
+                message = "Score must be a whole number of at least 0."
+            elif score is not None and record.task_max_score and score > record.task_max_score:
+                message = f"Score ({score}) cannot exceed maximum score ({record.task_max_score})!"
+            elif status not in (None, 'graded', 'returned'):
+                message = f"Status {status!r} cannot be set from the gradebook."
+            elif status and status != record.status and record.status != 'submitted':
+                message = "Task must be submitted before grading."
+            # Scores are given to submitted work, or corrected on work already graded
+            elif score is not None and record.status not in ('submitted', 'graded'):
+                message = "Task must be submitted before grading."
+
+            if message:
+                errors.append({'id': record.id, 'message': message})
+            else:
+                values.append((record.id, score, grade.get('note'), status))
+
+        if values:
+            self.flush(['score', 'teacher_note', 'status', 'graded_date', 'overdue'])
+            self.env.cr.execute("""
+                UPDATE olearn2_task_record r
+                   SET score = COALESCE(v.score, r.score),
+                       teacher_note = COALESCE(v.note, r.teacher_note),
+                       status = COALESCE(v.status, r.status),
+                       graded_date = CASE WHEN v.status IS NOT NULL THEN %s ELSE r.graded_date END,
+                       overdue = CASE WHEN v.status IS NOT NULL THEN FALSE ELSE r.overdue END,
+                       write_uid = %s,
+                       write_date = %s
+                  FROM (VALUES {}) AS v (id, score, note, status)
+                 WHERE r.id = v.id
+            """.format(', '.join(['(%s, %s::int, %s::text, %s::varchar)'] * len(values))),
+                [fields.Datetime.now(), self.env.uid, fields.Datetime.now()]
+                + [value for row in values for value in row])
+
+            updated = self.browse([row[0] for row in values])
+            updated.invalidate_cache(['score', 'teacher_note', 'status', 'graded_date', 'overdue'])
+            # Stored task counters depend on the status
+            updated.modified(['status'])
+            updated._refresh_course_progress()
+
+        return {
+            'updated': [row[0] for row in values],
+            'errors': errors,
+        }
+
+    # Prevent duplicate tasks for same student, the existing record is returned instead
+    @api.model_create_multi
+    def create(self, vals_list):
+        keys = [(vals.get('task_id'), vals.get('student_id')) for vals in vals_list]
+        record_ids = self._get_existing_record_ids([key for key in keys if all(key)])
+
+        new_vals_list = []
+        for key, vals in zip(keys, vals_list):
+            if all(key) and key in record_ids:
                 continue
+            if all(key):
+                # Later duplicates inside the batch resolve to this record
+                record_ids[key] = None
+            new_vals_list.append(vals)
 
-            task.write({
-                'status': 'graded',
-                'graded_date': fields.Datetime.now()
-            })
+        new_records = super().create(new_vals_list) if new_vals_list else self.browse()
+        new_records._refresh_course_progress()
 
-    # Prevent duplicate tasks for same student
+        new_ids = iter(new_records.ids)
+        result_ids = []
+        for key in keys:
+            if all(key) and record_ids[key]:
+                result_ids.append(record_ids[key])
+                continue
+            record_id = next(new_ids)
+            if all(key):
+                record_ids[key] = record_id
+            result_ids.append(record_id)
+        return self.browse(result_ids)
+
+    # Map (task id, student id) pairs to the ids of their existing records
     @api.model
-    def create(self, vals):
-        if 'task_id' in vals and 'student_id' in vals:
-            existing = self.search([
-                ('task_id', '=', vals['task_id']),
-                ('student_id', '=', vals['student_id'])
-            ], limit=1)
-            if existing:
-                return existing
-        return super().create(vals)
+    def _get_existing_record_ids(self, keys):
+        keys = list(set(keys))
+        if not keys:
+            return {}
+
+        self.flush(['task_id', 'student_id'])
+        self.env.cr.execute("""
+            SELECT r.task_id, r.student_id, r.id
+              FROM olearn2_task_record r
+              JOIN (VALUES {}) AS v (task_id, student_id)
+                ON v.task_id = r.task_id AND v.student_id = r.student_id
+        """.format(', '.join(['(%s, %s)'] * len(keys))),
+            [value for key in keys for value in key])
+        return {(task_id, student_id): record_id for task_id, student_id, record_id in self.env.cr.fetchall()}
+
+    def write(self, vals):
+        # Moving a record also changes the progress of the pair it leaves
+        pairs = self._get_progress_pairs() if {'task_id', 'student_id'} & set(vals) else []
+        result = super().write(vals)
+        if {'status', 'score', 'submission_date', 'graded_date', 'task_id', 'student_id'} & set(vals):
+            self.env['olearn2.course.progress'].sudo()._refresh(pairs + self._get_progress_pairs())
+        return result
+
+    def unlink(self):
+        pairs = self._get_progress_pairs()
+        result = super().unlink()
+        self.env['olearn2.course.progress'].sudo()._refresh(pairs)
+        return result
+
+    def _get_progress_pairs(self):
+        return [(record.course_id.id, record.student_id.id) for record in self.sudo()]
+
+    # Update the stored course progress of the affected students
+    def _refresh_course_progress(self):
+        self.env['olearn2.course.progress'].sudo()._refresh(self._get_progress_pairs())
 
     # Check score doesn't exceed max score
     @api.constrains('score', 'task_id.max_score')
     def _check_score(self):
         for record in self:
-            if record.task_id.max_score and record.score > record.task_id.max_score:
+            if record.task_max_score and record.score > record.task_max_score:
                 raise exceptions.ValidationError(
-                    f"Score ({record.score}) cannot exceed maximum score ({record.task_id.max_score})!"
+                    f"Score ({record.score}) cannot exceed maximum score ({record.task_max_score})!"
                 )
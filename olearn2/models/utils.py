@@ -0,0 +1,15 @@
+# Number of comodel records per stored record, grouped on the comodel's inverse field
+def count_by_inverse(records, comodel, inverse_field):
+    ids = [record_id for record_id in records.ids if record_id]
+    if not ids:
+        return {}
+    groups = records.env[comodel].read_group(
+        [(inverse_field, 'in', ids)], [inverse_field], [inverse_field]
+    )
+    return {group[inverse_field][0]: group[f'{inverse_field}_count'] for group in groups}
+
+
+# Assign the counts, records not stored yet count their relation in cache
+def assign_counts(records, count_field, relation_field, counts):
+    for record in records:
+        record[count_field] = counts.get(record.id, 0) if record.id else len(record[relation_field])
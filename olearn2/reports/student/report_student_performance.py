@@ -25,6 +25,24 @@ class ReportStudentPerformance(models.AbstractModel):
         total_score = 0
         total_max_score = 0
 
+        # Load all of the student's records once and index them by lesson / task
+        LessonRecord = self.env['olearn2.lesson.record'].sudo()
+        TaskRecord = self.env['olearn2.task.record'].sudo()
+        lesson_records = {
+            record.lesson_id.id: record
+            for record in LessonRecord.search([
+                ('lesson_id', 'in', courses.mapped('lesson_ids').ids),
+                ('student_id', '=', student_id)
+            ])
+        }
+        task_records = {
+            record.task_id.id: record
+            for record in TaskRecord.search([
+                ('task_id', 'in', courses.mapped('task_ids').ids),
+                ('student_id', '=', student_id)
+            ])
+        }
+
         for course in courses:
             lessons = course.lesson_ids.filtered(lambda l: not l.hidden)
             tasks = course.task_ids.filtered(lambda t: not t.hidden)
@@ -32,10 +50,7 @@ class ReportStudentPerformance(models.AbstractModel):
             lesson_data = []
             for lesson in lessons:
                 # Find lesson record for this student
-                lesson_record = self.env['olearn2.lesson.record'].sudo().search([
-                    ('lesson_id', '=', lesson.id),
-                    ('student_id', '=', student_id)
-                ], limit=1)
+                lesson_record = lesson_records.get(lesson.id, LessonRecord)
 
                 is_viewed = lesson_record.viewed if lesson_record else False
 
@@ -53,10 +68,7 @@ class ReportStudentPerformance(models.AbstractModel):
             task_data = []
             for task in tasks:
                 # Find task record for this student
-                task_record = self.env['olearn2.task.record'].sudo().search([
-                    ('task_id', '=', task.id),
-                    ('student_id', '=', student_id)
-                ], limit=1)
+                task_record = task_records.get(task.id, TaskRecord)
 
                 score = task_record.score if task_record else 0
                 max_score = task.max_score
@@ -15,14 +15,13 @@ class ReportCourseInfo(models.AbstractModel):
             tasks = course.task_ids.filtered(lambda t: not t.hidden)
             students = course.student_ids
 
+            lesson_views, student_views = self._get_lesson_view_counts(lessons, students)
+            task_totals, student_totals = self._get_task_record_totals(tasks, students)
+
             lesson_stats = []
             for lesson in lessons:
                 # Count how many students viewed this lesson
-                viewed_count = self.env['olearn2.lesson.record'].search_count([
-                    ('lesson_id', '=', lesson.id),
-                    ('student_id', 'in', students.ids),
-                    ('viewed', '=', True)
-                ])
+                viewed_count = lesson_views.get(lesson.id, 0)
 
                 lesson_stats.append({
                     'lesson': lesson,
@@ -33,20 +32,13 @@ class ReportCourseInfo(models.AbstractModel):
 
             task_stats = []
             for task in tasks:
+                totals = task_totals.get(task.id, {})
+
                 # Count completed tasks
-                completed_count = self.env['olearn2.task.record'].search_count([
-                    ('task_id', '=', task.id),
-                    ('student_id', 'in', students.ids),
-                    ('status', 'in', ['completed', 'graded'])
-                ])
+                completed_count = totals.get('completed', 0)
 
                 # Calculate average score
-                task_records = self.env['olearn2.task.record'].search([
-                    ('task_id', '=', task.id),
-                    ('student_id', 'in', students.ids),
-                    ('score', '>', 0)
-                ])
-                avg_score = sum(t.score for t in task_records) / len(task_records) if task_records else 0
+                avg_score = totals['scored_sum'] / totals['scored'] if totals.get('scored') else 0
 
                 task_stats.append({
                     'task': task,
@@ -59,27 +51,17 @@ class ReportCourseInfo(models.AbstractModel):
 
             student_stats = []
             for student in students:
+                totals = student_totals.get(student.id, {})
+
                 # Lessons viewed by this student
-                lessons_viewed = self.env['olearn2.lesson.record'].search_count([
-                    ('lesson_id', 'in', lessons.ids),
-                    ('student_id', '=', student.id),
-                    ('viewed', '=', True)
-                ])
+                lessons_viewed = student_views.get(student.id, 0)
 
                 # Tasks completed by this student
-                tasks_completed = self.env['olearn2.task.record'].search_count([
-                    ('task_id', 'in', tasks.ids),
-                    ('student_id', '=', student.id),
-                    ('status', 'in', ['completed', 'graded'])
-                ])
+                tasks_completed = totals.get('completed', 0)
 
                 # Student's scores
-                student_task_records = self.env['olearn2.task.record'].search([
-                    ('task_id', 'in', tasks.ids),
-                    ('student_id', '=', student.id)
-                ])
-                total_score = sum(tr.score for tr in student_task_records)
-                total_max_score = sum(tr.task_id.max_score for tr in student_task_records)
+                total_score = totals.get('score_sum', 0)
+                total_max_score = totals.get('max_score_sum', 0)
                 score_percentage = (total_score / total_max_score * 100) if total_max_score > 0 else 0
 
                 student_stats.append({
@@ -120,3 +102,60 @@ class ReportCourseInfo(models.AbstractModel):
             'docs': courses,
             'course_data': course_data,
         }
+
+    # Viewed lesson records counted per lesson and per student in one query
+    def _get_lesson_view_counts(self, lessons, students):
+        per_lesson, per_student = {}, {}
+        if not lessons or not students:
+            return per_lesson, per_student
+
+        self.env['olearn2.lesson.record'].flush(['lesson_id', 'student_id', 'viewed'])
+        self.env.cr.execute("""
+            SELECT lesson_id, student_id, COUNT(*)
+              FROM olearn2_lesson_record
+             WHERE lesson_id IN %s AND student_id IN %s AND viewed
+          GROUP BY GROUPING SETS ((lesson_id), (student_id))
+        """, (tuple(lessons.ids), tuple(students.ids)))
+        for lesson_id, student_id, count in self.env.cr.fetchall():
+            if lesson_id is not None:
+                per_lesson[lesson_id] = count
+            else:
+                per_student[student_id] = count
+
+        return per_lesson, per_student
+
+    # Task record completions and scores summed per task and per student in one query
+    def _get_task_record_totals(self, tasks, students):
+        per_task, per_student = {}, {}
+        if not tasks or not students:
+            return per_task, per_student
+
+        self.env['olearn2.task.record'].flush(['task_id', 'student_id', 'status', 'score'])
+        self.env['olearn2.task'].flush(['max_score'])
+        self.env.cr.execute("""
+            SELECT r.task_id,
+                   r.student_id,
+                   COUNT(*) FILTER (WHERE r.status IN ('completed', 'graded')),
+                   COUNT(*) FILTER (WHERE r.score > 0),
+                   COALESCE(SUM(r.score) FILTER (WHERE r.score > 0), 0),
+                   COALESCE(SUM(r.score), 0),
+                   COALESCE(SUM(t.max_score), 0)
+              FROM olearn2_task_record r
+              JOIN olearn2_task t ON t.id = r.task_id
+             WHERE r.task_id IN %s AND r.student_id IN %s
+          GROUP BY GROUPING SETS ((r.task_id), (r.student_id))
+        """, (tuple(tasks.ids), tuple(students.ids)))
+        for task_id, student_id, completed, scored, scored_sum, score_sum, max_score_sum in self.env.cr.fetchall():
+            totals = {
+                'completed': completed,
+                'scored': scored,
+                'scored_sum': scored_sum,
+                'score_sum': score_sum,
+                'max_score_sum': max_score_sum,
+            }
+            if task_id is not None:
+                per_task[task_id] = totals
+            else:
+                per_student[student_id] = totals
+
+        return per_task, per_student
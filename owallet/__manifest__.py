@@ -10,11 +10,15 @@ An accounting module for the online learning web 'oLearn' made using Odoo framew
     'data': [
         'security/security.xml',
         'security/ir.model.access.csv',
+        'security/record_rules.xml',
+
+        'data/ir_cron_data.xml',
 
         'views/wizard_deposit_guide_views.xml',
         'views/transaction_views.xml',
         'views/bonus_views.xml',
         'views/balance_views.xml',
+        'views/transaction_archive_views.xml',
 
         'views/main_menu.xml',
     ],
@@ -1,6 +1,7 @@
 from . import balance
 from . import bonus
 from . import transaction
+from . import transaction_archive
 from . import wizard_deposit
 from . import wizard_deposit_guide
 from . import olearn_course_ext
@@ -1,4 +1,4 @@
-from odoo import api, fields, models, exceptions
+from odoo import api, fields, models, exceptions, tools
 
 
 class Users(models.Model):
@@ -63,6 +63,25 @@ class Balance(models.Model):
         help="Master balance holds all system funds"
     )
 
+    shard_ids = fields.One2many(
+        'owallet.balance.shard',
+        'balance_id',
+        string='Shards',
+        readonly=True,
+    )
+
+    available_amount = fields.Monetary(
+        string="Available Amount",
+        currency_field='currency_id',
+        compute='_compute_available_amount',
+        help="Balance amount plus master credits not yet rolled up"
+    )
+
+    @api.depends('amount', 'shard_ids.amount')
+    def _compute_available_amount(self):
+        for record in self:
+            record.available_amount = record.amount + sum(record.sudo().shard_ids.mapped('amount'))
+
     @api.constrains("amount")
     def _check_amount(self):
         for record in self:
@@ -78,39 +97,212 @@ class Balance(models.Model):
     def has_sufficient_funds(self, amount):
         """Check if balance has sufficient funds"""
         self.ensure_one()
-        return self.amount >= amount
+        return self.available_amount >= amount
 
     def add_funds(self, amount):
-        """Add funds to balance"""
+        """Add funds to balance, returning the new amount"""
         self.ensure_one()
         if amount <= 0:
             raise exceptions.ValidationError("Amount must be positive")
-        self.write({'amount': self.amount + amount})
+        if self.is_master and self._get_master_shard_count():
+            # Shards have no single running total; the rollup settles these later
+            self._add_to_shard(amount)
+            return None
+        return self._update_amount(amount)
+
+    def deduct_funds(self, amount, transactions=None):
+        """Deduct funds from balance, returning the new amount.
 
-    def deduct_funds(self, amount):
-        """Deduct funds from balance"""
+        ``transactions`` are the ones this debit applies, the caller stamps
+        them so the shard rollup leaves them out.
+        """
         self.ensure_one()
         if amount <= 0:
             raise exceptions.ValidationError("Amount must be positive")
-        if not self.has_sufficient_funds(amount):
+        if self.is_master:
+            # Debits need the full amount on the canonical row
+            self._rollup_shards(exclude=transactions)
+        new_amount = self._update_amount(-amount)
+        if new_amount is None:
             raise exceptions.ValidationError("Insufficient funds")
-        self.write({'amount': self.amount - amount})
+        return new_amount
+
+    def _update_amount(self, delta):
+        """Apply delta to the amount in one conditional UPDATE.
+
+        The new amount is computed by the database from the locked row, so
+        concurrent updates on the same wallet never work from a stale read.
+        Returns the new amount, or None if the balance would go negative.
+        """
+        self.ensure_one()
+        return self._update_amounts({self.id: delta}).get(self.id)
+
+    @api.model
+    def _update_amounts(self, deltas):
+        """Apply {balance id: delta} to many balances in one conditional UPDATE.
+
+        Returns {balance id: new amount} for the balances that were updated;
+        balances that would go negative are left untouched and omitted.
+        """
+        if not deltas:
+            return {}
+        balances = self.browse(list(deltas))
+        # Push pending ORM writes before touching the column directly
+        balances.flush(['amount'], balances)
+        self.env.cr.execute("""
+            UPDATE owallet_balance b
+               SET amount = b.amount + d.delta,
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM (VALUES {}) AS d(id, delta)
+             WHERE b.id = d.id AND b.amount + d.delta >= 0
+         RETURNING b.id, b.amount
+        """.format(', '.join(['(%s, %s)'] * len(deltas))),
+            [self.env.uid] + [value for item in deltas.items() for value in item])
+        result = dict(self.env.cr.fetchall())
+        balances.invalidate_cache(['amount', 'write_uid', 'write_date'], balances.ids)
+        return result
+
+    @api.model
+    def _get_master_shard_count(self):
+        """Number of shards master credits are spread over, 0 disables sharding"""
+        return int(self.env['ir.config_parameter'].sudo().get_param('owallet.master_shard_count', 0))
+
+    def _add_to_shard(self, amount):
+        """Credit one shard of the master balance instead of its canonical row.
+
+        The shard is picked from the paying user, so concurrent enrollments
+        by different students lock different rows.
+        """
+        self.ensure_one()
+        shard_model = self.env['owallet.balance.shard']
+        shard_model.flush(['balance_id', 'shard', 'amount'])
+        self.env.cr.execute("""
+            INSERT INTO owallet_balance_shard (balance_id, shard, amount)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (balance_id, shard)
+            DO UPDATE SET amount = owallet_balance_shard.amount + EXCLUDED.amount
+         RETURNING id
+        """, (self.id, self.env.uid % self._get_master_shard_count(), amount))
+        shard_model.invalidate_cache(['amount'], [row[0] for row in self.env.cr.fetchall()])
+        self.invalidate_cache(['shard_ids', 'available_amount'], self.ids)
+
+    def _rollup_shards(self, exclude=None):
+        """Fold shard amounts into the canonical balance row.
+
+        Transactions in ``exclude`` are not applied to the amount yet and
+        are not stamped with it.
+        """
+        shard_model = self.env['owallet.balance.shard']
+        shard_model.flush(['balance_id', 'shard', 'amount'])
+        for record in self:
+            self.env.cr.execute("""
+                DELETE FROM owallet_balance_shard
+                 WHERE balance_id = %s
+             RETURNING id, amount
+            """, (record.id,))
+            rows = self.env.cr.fetchall()
+            total = sum(row[1] for row in rows)
+            shard_model.invalidate_cache(['balance_id', 'shard', 'amount'], [row[0] for row in rows])
+            record.invalidate_cache(['shard_ids', 'available_amount'], record.ids)
+            new_amount = record._update_amount(total) if total else record.amount
+
+            # Stamp the credits that were parked in the shards
+            domain = [('balance_id', '=', record.id), ('balance_after', '=', False)]
+            if exclude:
+                domain.append(('id', 'not in', exclude.ids))
+            pending = self.env['owallet.transaction'].sudo().search(domain)
+            pending._stamp_balance_after({record.id: new_amount})
+
+    @api.model
+    def _cron_rollup_master_shards(self):
+        self.sudo().search([('is_master', '=', True)])._rollup_shards()
+
+    def amount_at(self, date):
+        """Balance amount at the given datetime, read from the running balance ledger"""
+        self.ensure_one()
+        self.env['owallet.transaction'].flush(['balance_id', 'date', 'amount', 'type', 'balance_after'])
+        # Closed months live in the archive, which keeps the running balances
+        self.env.cr.execute("""
+            SELECT balance_after
+              FROM (
+                    (SELECT date, id, balance_after
+                       FROM owallet_transaction
+                      WHERE balance_id = %(balance)s AND date <= %(date)s AND balance_after IS NOT NULL
+                   ORDER BY date DESC, id DESC
+                      LIMIT 1)
+                    UNION ALL
+                    (SELECT date, id, balance_after
+                       FROM owallet_transaction_archive
+                      WHERE balance_id = %(balance)s AND date <= %(date)s
+                   ORDER BY date DESC, id DESC
+                      LIMIT 1)
+                   ) latest
+          ORDER BY date DESC, id DESC
+             LIMIT 1
+        """, {'balance': self.id, 'date': date})
+        row = self.env.cr.fetchone()
+        amount = row[0] if row else 0.0
+
+        # Master credits not rolled up yet have no running balance
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(amount), 0)
+              FROM owallet_transaction
+             WHERE balance_id = %s AND date <= %s AND balance_after IS NULL
+               AND type IN ('deposit', 'bonus')
+        """, (self.id, date))
+        return amount + self.env.cr.fetchone()[0]
 
     @api.model
     def get_master_balance(self):
         """Get or create master balance for admin"""
-        admin_user = self.env.ref('base.user_admin')
-        master_balance = self.search([('owner_id', '=', admin_user.id)], limit=1)
+        master_balance = self.browse(self._get_master_balance_id())
 
         if not master_balance:
             master_balance = self.sudo().create({
-                'owner_id': admin_user.id,
+                'owner_id': self.env.ref('base.user_admin').id,
                 'amount': 0.0,
                 'is_master': True
             })
 
         return master_balance
 
+    @api.model
+    @tools.ormcache()
+    def _get_master_balance_id(self):
+        """Master balance id, cached per registry until balances change"""
+        admin_user = self.env.ref('base.user_admin')
+        return self.sudo().search([('owner_id', '=', admin_user.id)], limit=1).id
+
+    # clear_caches() empties every ormcache of the registry, only do it when the master is involved
+    def _is_master_affected(self):
+        admin_user = self.env.ref('base.user_admin')
+        return any(balance.is_master or balance.owner_id == admin_user for balance in self.sudo())
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        balances = super().create(vals_list)
+        if balances._is_master_affected():
+            self.clear_caches()
+        return balances
+
+    def write(self, vals):
+        if 'is_master' not in vals and 'owner_id' not in vals:
+            return super().write(vals)
+
+        master_affected = self._is_master_affected()
+        result = super().write(vals)
+        if master_affected or self._is_master_affected():
+            self.clear_caches()
+        return result
+
+    def unlink(self):
+        master_affected = self._is_master_affected()
+        result = super().unlink()
+        if master_affected:
+            self.clear_caches()
+        return result
+
     @api.model
     def action_open_my_wallet(self):
         """Open the current user's wallet balance"""
@@ -147,3 +339,33 @@ class Balance(models.Model):
             'target': 'current',
             'context': {'create': False, 'delete': False},
         }
+
+
+class BalanceShard(models.Model):
+    _name = "owallet.balance.shard"
+    _description = "Owallet Master Balance Shard"
+    _log_access = False
+
+    balance_id = fields.Many2one(
+        comodel_name="owallet.balance",
+        string="Balance",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+
+    shard = fields.Integer(
+        string="Shard",
+        required=True,
+    )
+
+    amount = fields.Float(
+        string="Amount",
+        default=0.0,
+    )
+
+    _sql_constraints = [
+        ('unique_balance_shard',
+         'UNIQUE(balance_id, shard)',
+         'A balance can only have one row per shard')
+    ]
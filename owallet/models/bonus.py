@@ -1,5 +1,5 @@
 from odoo import fields, models, api, exceptions
-from datetime import datetime, timedelta
+from datetime import datetime
 
 
 class Bonus(models.Model):
@@ -103,31 +103,60 @@ class Bonus(models.Model):
 
     @api.depends('teacher_id', 'year', 'month', 'bonus_percentage')
     def _compute_amount(self):
+        totals = self._get_expenditure_totals()
         for record in self:
-            if not record.teacher_id:
-                record.amount = 0.0
-                continue
-
-            first_day = datetime(record.year, record.month, 1)
-            if record.month == 12:
-                last_day = datetime(record.year + 1, 1, 1) - timedelta(seconds=1)
-            else:
-                last_day = datetime(record.year, record.month + 1, 1) - timedelta(seconds=1)
+            total_payments = totals.get((record.year, record.month, record.teacher_id.id), 0.0)
+            record.amount = total_payments * (record.bonus_percentage / 100.0)
 
-            teacher_courses = self.env['olearn2.course'].sudo().search([
-                ('teacher_id', '=', record.teacher_id.id)
-            ])
+    # Course payments per (year, month, teacher), one grouped query per period
+    def _get_expenditure_totals(self):
+        periods = {}
+        for record in self.filtered('teacher_id'):
+            periods.setdefault((record.year, record.month), set()).add(record.teacher_id.id)
 
-            transactions = self.env['owallet.transaction'].search([
-                ('course_id', 'in', teacher_courses.ids),
-                ('type', '=', 'expenditure'),
-                ('date', '>=', first_day),
-                ('date', '<=', last_day),
-            ])
+        if not periods:
+            return {}
 
-            total_payments = sum(transactions.mapped('amount'))
+        self.env['owallet.transaction'].flush(['course_id', 'type', 'date', 'amount'])
+        self.env['olearn2.course'].flush(['teacher_id', 'active'])
 
-            record.amount = total_payments * (record.bonus_percentage / 100.0)
+        totals = {}
+        for (year, month), teacher_ids in periods.items():
+            first_day = datetime(year, month, 1)
+            if month == 12:
+                next_first_day = datetime(year + 1, 1, 1)
+            else:
+                next_first_day = datetime(year, month + 1, 1)
+
+            self.env.cr.execute("""
+                SELECT c.teacher_id, SUM(t.amount)
+                  FROM owallet_transaction t
+                  JOIN olearn2_course c ON c.id = t.course_id
+                 WHERE t.type = 'expenditure'
+                   AND t.date >= %s AND t.date < %s
+                   AND c.active
+                   AND c.teacher_id IN %s
+              GROUP BY c.teacher_id
+            """, (first_day, next_first_day, tuple(teacher_ids)))
+            for teacher_id, total in self.env.cr.fetchall():
+                totals[(year, month, teacher_id)] = total
+
+            # Archived months are read from the per-course summaries
+            self.env.cr.execute("""
+                SELECT c.teacher_id, SUM(p.amount)
+                  FROM owallet_course_period p
+                  JOIN olearn2_course c ON c.id = p.course_id
+                 WHERE p.type = 'expenditure'
+                   AND p.period_start = %s
+                   AND c.active
+                   AND c.teacher_id IN %s
+              GROUP BY c.teacher_id
+            """, (first_day.date(), tuple(teacher_ids)))
+            for teacher_id, total in self.env.cr.fetchall():
+                key = (year, month, teacher_id)
+                totals[key] = totals.get(key, 0.0) + total
+
+        return totals
 
     def action_calculate_bonus(self):
         self.ensure_one()
@@ -185,6 +214,55 @@ class Bonus(models.Model):
             }
         }
 
+    def action_send_bonuses(self):
+        """Send every selected bonus that is not sent yet in one payout batch"""
+        if not self.env.user.has_group('owallet.group_accountant'):
+            raise exceptions.AccessError("Only accountants can send bonuses")
+
+        # Lock the rows so retries and concurrent sends skip what is already paid,
+        # only calculated bonuses are paid out
+        self.flush(['sent', 'state'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM owallet_bonus
+             WHERE id IN %s AND sent IS NOT TRUE AND state = 'calculated'
+          ORDER BY id
+               FOR UPDATE
+        """, (tuple(self.ids) or (0,),))
+        bonuses = self.browse([row[0] for row in self.env.cr.fetchall()]).filtered(
+            lambda b: b.amount > 0
+        )
+        skipped_count = len(self) - len(bonuses)
+
+        if bonuses:
+            transactions = self.env['owallet.transaction'].create_bonus_transactions(bonuses)
+
+            bonuses.write({
+                'sent': True,
+                'state': 'sent',
+            })
+
+            values = [(bonus_id, transaction.id) for bonus_id, transaction in transactions.items()]
+            self.env.cr.execute("""
+                UPDATE owallet_bonus b
+                   SET transaction_id = v.transaction_id
+                  FROM (VALUES {}) AS v(id, transaction_id)
+                 WHERE b.id = v.id
+            """.format(', '.join(['(%s, %s)'] * len(values))),
+                [value for item in values for value in item])
+            bonuses.invalidate_cache(['transaction_id'], bonuses.ids)
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Bonuses Sent',
+                'message': f'{len(bonuses)} bonuses sent, {skipped_count} skipped (not calculated, already sent or zero amount)',
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
     @api.model
     def action_calculate_all_bonuses(self):
         if not self.env.user.has_group('owallet.group_accountant'):
@@ -203,21 +281,19 @@ class Bonus(models.Model):
             ('id', 'not in', master_balance_users.ids),
         ])
 
-        created_count = 0
-        for teacher in teachers:
-            existing_bonus = self.search([
-                ('teacher_id', '=', teacher.id),
-                ('year', '=', current_year),
-                ('month', '=', current_month),
-            ], limit=1)
-
-            if not existing_bonus:
-                self.create({
-                    'teacher_id': teacher.id,
-                    'year': current_year,
-                    'month': current_month,
-                })
-                created_count += 1
+        existing_teacher_ids = set(self.search([
+            ('teacher_id', 'in', teachers.ids),
+            ('year', '=', current_year),
+            ('month', '=', current_month),
+        ]).mapped('teacher_id').ids)
+
+        # Amounts of the new records are computed together in one pass
+        new_bonuses = self.create([{
+            'teacher_id': teacher.id,
+            'year': current_year,
+            'month': current_month,
+        } for teacher in teachers if teacher.id not in existing_teacher_ids])
+        created_count = len(new_bonuses)
 
         return {
             'type': 'ir.actions.client',
@@ -1,4 +1,6 @@
-from odoo import fields, models, api, exceptions
+from collections import defaultdict
+
+from odoo import fields, models, api, exceptions, tools
 
 
 class Transaction(models.Model):
@@ -74,21 +76,197 @@ class Transaction(models.Model):
         string='Related Bonus',
     )
 
-    @api.model
-    def create(self, vals):
-        transaction = super().create(vals)
+    idempotency_key = fields.Char(
+        string='Idempotency Key',
+        readonly=True,
+        copy=False,
+        help='Client supplied key; resubmitting it returns the original transaction'
+    )
 
-        balance = transaction.balance_id
+    _sql_constraints = [
+        ('unique_idempotency_key',
+         'UNIQUE(idempotency_key)',
+         'A transaction with this idempotency key already exists')
+    ]
 
-        if transaction.type == 'deposit' or transaction.type == 'bonus':
-            balance.add_funds(transaction.amount)
-        elif transaction.type in ['expenditure', 'withdraw']:
-            balance.deduct_funds(transaction.amount)
+    balance_after = fields.Monetary(
+        string='Balance After',
+        currency_field='currency_id',
+        readonly=True,
+        copy=False,
+        help='Wallet amount right after this transaction was applied'
+    )
 
-        return transaction
+    def _auto_init(self):
+        backfill = not tools.column_exists(self.env.cr, self._table, 'balance_after')
+        res = super()._auto_init()
+        tools.create_index(self.env.cr, 'owallet_transaction_balance_date_index',
+                           self._table, ['balance_id', 'date DESC', 'id DESC'])
+        # Bonus computation: course payments of a type within a month
+        tools.create_index(self.env.cr, 'owallet_transaction_course_type_date_index',
+                           self._table, ['course_id', 'type', 'date'])
+        # Statements and "My Transactions": one owner's history, newest first
+        tools.create_index(self.env.cr, 'owallet_transaction_owner_date_index',
+                           self._table, ['owner_id', 'date DESC'])
+        # Archiving: transactions of a closed month
+        tools.create_index(self.env.cr, 'owallet_transaction_date_index',
+                           self._table, ['date'])
+        # Master credits parked in shards wait here until the next rollup
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS owallet_transaction_balance_after_pending_index
+                ON owallet_transaction (balance_id) WHERE balance_after IS NULL
+        """)
+        if backfill:
+            self.env.cr.execute("""
+                UPDATE owallet_transaction t
+                   SET balance_after = r.running
+                  FROM (SELECT id,
+                               SUM(CASE WHEN type IN ('deposit', 'bonus') THEN amount ELSE -amount END)
+                                   OVER (PARTITION BY balance_id ORDER BY date, id) AS running
+                          FROM owallet_transaction) r
+                 WHERE t.id = r.id
+            """)
+        return res
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Keys that were already used return their original transaction untouched
+        keys = [vals['idempotency_key'] for vals in vals_list if vals.get('idempotency_key')]
+        by_key = {}
+        if keys:
+            by_key = {
+                transaction.idempotency_key: transaction.with_env(self.env)
+                for transaction in self.sudo().search([('idempotency_key', 'in', keys)])
+            }
+            # The original of an archived key cannot be returned any more
+            archived_keys = self._get_archived_idempotency_keys([key for key in keys if key not in by_key])
+            if archived_keys:
+                raise exceptions.UserError(
+                    f"Idempotency key already used by an archived transaction: {', '.join(sorted(archived_keys))}"
+                )
+
+        new_vals_list = []
+        for vals in vals_list:
+            key = vals.get('idempotency_key')
+            if not key or key not in by_key:
+                new_vals_list.append(vals)
+                if key:
+                    by_key[key] = None
+
+        new_transactions = super().create(new_vals_list) if new_vals_list else self.browse()
+        new_transactions._apply_to_balances()
+
+        created = iter(new_transactions)
+        ids = []
+        for vals in vals_list:
+            key = vals.get('idempotency_key')
+            if key and by_key[key]:
+                ids.append(by_key[key].id)
+            else:
+                transaction = next(created)
+                if key:
+                    by_key[key] = transaction
+                ids.append(transaction.id)
+        return self.browse(ids)
+
+    # Keys already used by an archived transaction
+    @api.model
+    def _get_archived_idempotency_keys(self, keys):
+        if not keys:
+            return set()
+        archived = self.env['owallet.transaction.archive'].sudo().search([('idempotency_key', 'in', keys)])
+        return set(archived.mapped('idempotency_key'))
 
+    # Keys already used by a live or an archived transaction
     @api.model
-    def create_enrollment_transaction(self, student_user, course):
+    def _get_used_idempotency_keys(self, keys):
+        used = set(self.sudo().search([('idempotency_key', 'in', keys)]).mapped('idempotency_key'))
+        return used | self._get_archived_idempotency_keys([key for key in keys if key not in used])
+
+    # Key of each student's next enrollment charge in the course.
+    # Every earlier charge of the student starts a new generation, so a
+    # student removed from the course pays again when enrolled again.
+    @api.model
+    def _get_enrollment_idempotency_keys(self, course, student_users):
+        prefix = f'enroll-{course.id}-'
+        self.flush(['course_id', 'type', 'idempotency_key'])
+        self.env.cr.execute("""
+            SELECT idempotency_key FROM owallet_transaction
+             WHERE course_id = %(course_id)s AND type = 'expenditure' AND idempotency_key LIKE %(pattern)s
+             UNION ALL
+            SELECT idempotency_key FROM owallet_transaction_archive
+             WHERE course_id = %(course_id)s AND type = 'expenditure' AND idempotency_key LIKE %(pattern)s
+        """, {'course_id': course.id, 'pattern': f'{prefix}%:debit'})
+        generations = defaultdict(int)
+        for key, in self.env.cr.fetchall():
+            generations[key[len(prefix):].split('-')[0]] += 1
+        return {student.id: f'{prefix}{student.id}-{generations[str(student.id)]}' for student in student_users}
+
+    # Apply transactions to their balances, one net delta per balance
+    def _apply_to_balances(self):
+        deltas = defaultdict(float)
+        for transaction in self:
+            deltas[transaction.balance_id] += transaction._signed_amount()
+
+        # The master balance keeps its own credit/debit paths (shards, rollup)
+        new_amounts = {}
+        plain_deltas = {}
+        for balance, delta in deltas.items():
+            if balance.is_master and delta > 0:
+                new_amounts[balance.id] = balance.add_funds(delta)
+            elif balance.is_master and delta < 0:
+                new_amounts[balance.id] = balance.deduct_funds(-delta, transactions=self)
+            elif delta:
+                plain_deltas[balance.id] = delta
+            else:
+                new_amounts[balance.id] = balance.amount
+
+        updated = self.env['owallet.balance']._update_amounts(plain_deltas)
+        if len(updated) < len(plain_deltas):
+            raise exceptions.ValidationError("Insufficient funds")
+        new_amounts.update(updated)
+
+        self._stamp_balance_after(new_amounts)
+
+    def _signed_amount(self):
+        self.ensure_one()
+        if self.type in ['deposit', 'bonus']:
+            return self.amount
+        if self.type in ['expenditure', 'withdraw']:
+            return -self.amount
+        return 0.0
+
+    def _stamp_balance_after(self, end_amounts):
+        """Store running balances, given {balance id: amount after all of self}.
+
+        Balances mapped to None (sharded master credits) are left unstamped.
+        """
+        running = dict(end_amounts)
+        values = []
+        for transaction in self.sorted(lambda t: (t.date, t.id), reverse=True):
+            balance_id = transaction.balance_id.id
+            if running.get(balance_id) is None:
+                continue
+            values.append((transaction.id, running[balance_id]))
+            running[balance_id] -= transaction._signed_amount()
+
+        if not values:
+            return
+        self.flush(['balance_after'])
+        self.env.cr.execute("""
+            UPDATE owallet_transaction t
+               SET balance_after = v.balance_after
+              FROM (VALUES {}) AS v(id, balance_after)
+             WHERE t.id = v.id
+        """.format(', '.join(['(%s, %s)'] * len(values))),
+            [value for item in values for value in item])
+        self.invalidate_cache(['balance_after'], [transaction_id for transaction_id, _amount in values])
+
+    @api.model
+    def create_enrollment_transaction(self, student_user, course, idempotency_key=None):
+        if idempotency_key and self._get_used_idempotency_keys([f'{idempotency_key}:debit']):
+            return True
+
         student_balance = self.env['owallet.balance'].search([
             ('owner_id', '=', student_user.id)
         ], limit=1)
@@ -108,6 +286,7 @@ class Transaction(models.Model):
             'source': 'automatic',
             'course_id': course.id,
             'description': f'Enrollment in course: {course.name}',
+            'idempotency_key': idempotency_key and f'{idempotency_key}:debit',
         })
 
         master_transaction = self.create({
@@ -117,12 +296,76 @@ class Transaction(models.Model):
             'source': 'automatic',
             'course_id': course.id,
             'description': f'Payment from {student_user.name} for course: {course.name}',
+            'idempotency_key': idempotency_key and f'{idempotency_key}:credit',
         })
 
         return True
 
     @api.model
-    def create_deposit_transaction(self, user, amount, description):
+    def create_enrollment_transactions(self, student_users, course, idempotency_keys=None):
+        """Charge many students for one course in a single pass.
+
+        ``idempotency_keys`` maps user ids to the key their charge is made under.
+
+        Returns the charged users and a {user id: reason} dict for the rest.
+        """
+        failed = {}
+        if not student_users:
+            return student_users, failed
+        idempotency_keys = idempotency_keys or {}
+
+        # Lock the wallets in id order so concurrent batches cannot deadlock
+        self.env['owallet.balance'].flush(['owner_id', 'amount'])
+        self.env.cr.execute("""
+            SELECT id, owner_id, amount
+              FROM owallet_balance
+             WHERE owner_id IN %s
+          ORDER BY id
+               FOR UPDATE
+        """, (tuple(student_users.ids),))
+        balances = {owner_id: (balance_id, amount) for balance_id, owner_id, amount in self.env.cr.fetchall()}
+
+        charged = student_users.browse()
+        for student in student_users:
+            if student.id not in balances:
+                failed[student.id] = "Student does not have a wallet balance"
+            elif balances[student.id][1] < course.cost:
+                failed[student.id] = f"Insufficient balance. Required: {course.cost} {course.currency_id.symbol}"
+            else:
+                charged |= student
+
+        if not charged:
+            return charged, failed
+
+        master_balance = self.env['owallet.balance'].get_master_balance()
+
+        vals_list = []
+        for student in charged:
+            key = idempotency_keys.get(student.id)
+            vals_list.append({
+                'balance_id': balances[student.id][0],
+                'amount': course.cost,
+                'type': 'expenditure',
+                'source': 'automatic',
+                'course_id': course.id,
+                'description': f'Enrollment in course: {course.name}',
+                'idempotency_key': key and f'{key}:debit',
+            })
+            vals_list.append({
+                'balance_id': master_balance.id,
+                'amount': course.cost,
+                'type': 'deposit',
+                'source': 'automatic',
+                'course_id': course.id,
+                'description': f'Payment from {student.name} for course: {course.name}',
+                'idempotency_key': key and f'{key}:credit',
+            })
+        self.create(vals_list)
+
+        return charged, failed
+
+    @api.model
+    def create_deposit_transaction(self, user, amount, description, idempotency_key=None):
         if not self.env.user.has_group('owallet.group_accountant'):
             raise exceptions.AccessError("Only accountants can create deposits")
 
@@ -139,6 +382,7 @@ class Transaction(models.Model):
             'type': 'deposit',
             'source': 'accountant',
             'description': description or f'Deposit by accountant {self.env.user.name}',
+            'idempotency_key': idempotency_key,
         })
 
     @api.model
@@ -165,6 +409,7 @@ class Transaction(models.Model):
             'source': 'accountant',
             'description': f'Bonus payout to {teacher_user.name} for {bonus_record.month}/{bonus_record.year}',
             'bonus_id': bonus_record.id,
+            'idempotency_key': f'bonus-{bonus_record.id}:debit',
         })
 
         teacher_transaction = self.create({
@@ -174,10 +419,64 @@ class Transaction(models.Model):
             'source': 'accountant',
             'description': description or f'Bonus for {bonus_record.month}/{bonus_record.year}',
             'bonus_id': bonus_record.id,
+            'idempotency_key': f'bonus-{bonus_record.id}:credit',
         })
 
         return teacher_transaction
 
+    @api.model
+    def create_bonus_transactions(self, bonus_records):
+        """Pay out many bonuses with one batch of transactions.
+
+        The master debits are netted into a single balance update.
+        Returns {bonus id: teacher transaction}.
+        """
+        if not self.env.user.has_group('owallet.group_accountant'):
+            raise exceptions.AccessError("Only accountants can create bonus payouts")
+
+        teacher_balances = {
+            balance.owner_id.id: balance
+            for balance in self.env['owallet.balance'].search([
+                ('owner_id', 'in', bonus_records.mapped('teacher_id').ids)
+            ])
+        }
+        missing = bonus_records.mapped('teacher_id').filtered(lambda t: t.id not in teacher_balances)
+        if missing:
+            raise exceptions.UserError(
+                f"Teachers without a wallet balance: {', '.join(missing.mapped('name'))}"
+            )
+
+        master_balance = self.env['owallet.balance'].get_master_balance()
+
+        if not master_balance.has_sufficient_funds(sum(bonus_records.mapped('amount'))):
+            raise exceptions.UserError("Insufficient funds in master balance")
+
+        vals_list = []
+        for bonus_record in bonus_records:
+            teacher_user = bonus_record.teacher_id
+            vals_list.append({
+                'balance_id': master_balance.id,
+                'amount': bonus_record.amount,
+                'type': 'expenditure',
+                'source': 'accountant',
+                'description': f'Bonus payout to {teacher_user.name} for {bonus_record.month}/{bonus_record.year}',
+                'bonus_id': bonus_record.id,
+                'idempotency_key': f'bonus-{bonus_record.id}:debit',
+            })
+            vals_list.append({
+                'balance_id': teacher_balances[teacher_user.id].id,
+                'amount': bonus_record.amount,
+                'type': 'bonus',
+                'source': 'accountant',
+                'description': f'Bonus for {bonus_record.month}/{bonus_record.year}',
+                'bonus_id': bonus_record.id,
+                'idempotency_key': f'bonus-{bonus_record.id}:credit',
+            })
+
+        transactions = self.create(vals_list)
+
+        return {transaction.bonus_id.id: transaction for transaction in transactions.filtered(lambda t: t.type == 'bonus')}
+
     @api.constrains('amount')
     def _check_amount(self):
         for record in self:
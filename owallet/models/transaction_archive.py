@@ -0,0 +1,299 @@
+from dateutil.relativedelta import relativedelta
+
+from odoo import fields, models, api, tools
+
+TRANSACTION_TYPES = [
+    ("deposit", "Deposit"),
+    ("expenditure", "Expenditure"),
+    ("withdraw", "Withdraw"),
+    ("bonus", "Bonus Payout"),
+]
+
+
+class TransactionArchive(models.Model):
+    _name = "owallet.transaction.archive"
+    _description = "Owallet Archived Transaction"
+    _order = "date desc, id desc"
+    _rec_name = "description"
+    _log_access = False
+
+    # Rows keep the id they had in owallet.transaction
+    balance_id = fields.Many2one(
+        comodel_name='owallet.balance',
+        string='Balance',
+        readonly=True,
+        ondelete='cascade',
+        index=True,
+    )
+
+    owner_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Owner',
+        readonly=True,
+    )
+
+    amount = fields.Monetary(
+        string='Amount',
+        currency_field='currency_id',
+        readonly=True,
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True,
+    )
+
+    type = fields.Selection(
+        TRANSACTION_TYPES,
+        string='Transaction Type',
+        readonly=True,
+    )
+
+    source = fields.Selection([
+        ("automatic", "Automatic"),
+        ("accountant", "Accountant"),
+    ],
+        string='Source',
+        readonly=True,
+    )
+
+    course_id = fields.Many2one(
+        comodel_name='olearn2.course',
+        string='Related Course',
+        readonly=True,
+    )
+
+    description = fields.Char(
+        string='Description',
+        readonly=True,
+    )
+
+    date = fields.Datetime(
+        string='Transaction Date',
+        readonly=True,
+    )
+
+    bonus_id = fields.Many2one(
+        'owallet.bonus',
+        string='Related Bonus',
+        readonly=True,
+    )
+
+    balance_after = fields.Monetary(
+        string='Balance After',
+        currency_field='currency_id',
+        readonly=True,
+    )
+
+    idempotency_key = fields.Char(
+        string='Idempotency Key',
+        readonly=True,
+        index=True,
+    )
+
+    def _auto_init(self):
+        res = super()._auto_init()
+        tools.create_index(self.env.cr, 'owallet_transaction_archive_balance_date_index',
+                           self._table, ['balance_id', 'date DESC', 'id DESC'])
+        return res
+
+    @api.model
+    def _cron_archive_closed_months(self):
+        """Move transactions of closed months out of the hot table.
+
+        A month is closed once it is older than the retention window
+        (owallet.archive_retention_months). Each month is moved in one
+        statement that also folds it into the period summaries.
+        """
+        retention = int(self.env['ir.config_parameter'].sudo().get_param('owallet.archive_retention_months', 3))
+        cutoff = fields.Date.start_of(fields.Date.today(), 'month') - relativedelta(months=retention)
+
+        self.env['owallet.transaction'].flush()
+        self.env['owallet.bonus'].flush(['transaction_id'])
+        # Only months that still hold archivable rows, rows kept hot must not pin the scan
+        self.env.cr.execute("""
+            SELECT DISTINCT date_trunc('month', t.date)::date
+              FROM owallet_transaction t
+             WHERE t.date < %s
+               AND t.balance_after IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM owallet_bonus b WHERE b.transaction_id = t.id)
+          ORDER BY 1
+        """, (cutoff,))
+        for period_start, in self.env.cr.fetchall():
+            self._archive_period(period_start, period_start + relativedelta(months=1))
+
+        self.env['owallet.transaction'].invalidate_cache()
+
+    @api.model
+    def _archive_period(self, period_start, period_end):
+        # Unsettled master credits and rows linked from a bonus stay hot
+        self.env.cr.execute("""
+            WITH moved AS (
+                DELETE FROM owallet_transaction t
+                 WHERE t.date >= %(start)s AND t.date < %(end)s
+                   AND t.balance_after IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM owallet_bonus b WHERE b.transaction_id = t.id)
+             RETURNING t.id, t.balance_id, t.owner_id, t.amount, t.currency_id, t.type, t.source,
+                       t.course_id, t.description, t.date, t.bonus_id, t.balance_after,
+                       t.idempotency_key
+            ),
+            archived AS (
+                INSERT INTO owallet_transaction_archive
+                       (id, balance_id, owner_id, amount, currency_id, type, source,
+                        course_id, description, date, bonus_id, balance_after, idempotency_key)
+                SELECT id, balance_id, owner_id, amount, currency_id, type, source,
+                       course_id, description, date, bonus_id, balance_after, idempotency_key
+                  FROM moved
+            ),
+            balance_totals AS (
+                INSERT INTO owallet_balance_period AS p
+                       (balance_id, period_start, credit_amount, debit_amount, transaction_count,
+                        closing_amount, opening_amount, last_date)
+                SELECT balance_id, %(start)s,
+                       SUM(CASE WHEN type IN ('deposit', 'bonus') THEN amount ELSE 0 END),
+                       SUM(CASE WHEN type IN ('expenditure', 'withdraw') THEN amount ELSE 0 END),
+                       COUNT(*),
+                       (ARRAY_AGG(balance_after ORDER BY date DESC, id DESC))[1],
+                       (ARRAY_AGG(balance_after ORDER BY date DESC, id DESC))[1]
+                           - SUM(CASE WHEN type IN ('deposit', 'bonus') THEN amount ELSE -amount END),
+                       MAX(date)
+                  FROM moved
+              GROUP BY balance_id
+                    ON CONFLICT (balance_id, period_start) DO UPDATE SET
+                       credit_amount = p.credit_amount + EXCLUDED.credit_amount,
+                       debit_amount = p.debit_amount + EXCLUDED.debit_amount,
+                       transaction_count = p.transaction_count + EXCLUDED.transaction_count,
+                       closing_amount = CASE WHEN EXCLUDED.last_date >= p.last_date
+                                             THEN EXCLUDED.closing_amount ELSE p.closing_amount END,
+                       opening_amount = CASE WHEN EXCLUDED.last_date >= p.last_date
+                                             THEN EXCLUDED.closing_amount ELSE p.closing_amount END
+                                        - (p.credit_amount + EXCLUDED.credit_amount)
+                                        + (p.debit_amount + EXCLUDED.debit_amount),
+                       last_date = GREATEST(p.last_date, EXCLUDED.last_date)
+            )
+            INSERT INTO owallet_course_period AS p
+                   (course_id, period_start, type, amount, transaction_count)
+            SELECT course_id, %(start)s, type, SUM(amount), COUNT(*)
+              FROM moved
+             WHERE course_id IS NOT NULL
+          GROUP BY course_id, type
+                ON CONFLICT (course_id, period_start, type) DO UPDATE SET
+                   amount = p.amount + EXCLUDED.amount,
+                   transaction_count = p.transaction_count + EXCLUDED.transaction_count
+        """, {'start': period_start, 'end': period_end})
+
+
+class BalancePeriod(models.Model):
+    _name = "owallet.balance.period"
+    _description = "Owallet Monthly Balance Summary"
+    _order = "period_start desc"
+    _rec_name = "balance_id"
+    _log_access = False
+
+    balance_id = fields.Many2one(
+        comodel_name='owallet.balance',
+        string='Balance',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True,
+    )
+
+    period_start = fields.Date(
+        string='Month',
+        required=True,
+        readonly=True,
+    )
+
+    currency_id = fields.Many2one(
+        related='balance_id.currency_id',
+        string='Currency',
+    )
+
+    opening_amount = fields.Monetary(
+        string='Opening Balance',
+        currency_field='currency_id',
+        readonly=True,
+    )
+
+    credit_amount = fields.Monetary(
+        string='Credits',
+        currency_field='currency_id',
+        readonly=True,
+    )
+
+    debit_amount = fields.Monetary(
+        string='Debits',
+        currency_field='currency_id',
+        readonly=True,
+    )
+
+    closing_amount = fields.Monetary(
+        string='Closing Balance',
+        currency_field='currency_id',
+        readonly=True,
+    )
+
+    transaction_count = fields.Integer(
+        string='Transactions',
+        readonly=True,
+    )
+
+    last_date = fields.Datetime(
+        string='Last Transaction',
+        readonly=True,
+    )
+
+    _sql_constraints = [
+        ('unique_balance_period',
+         'UNIQUE(balance_id, period_start)',
+         'A balance can only have one summary per month')
+    ]
+
+
+class CoursePeriod(models.Model):
+    _name = "owallet.course.period"
+    _description = "Owallet Monthly Course Summary"
+    _order = "period_start desc"
+    _rec_name = "course_id"
+    _log_access = False
+
+    course_id = fields.Many2one(
+        comodel_name='olearn2.course',
+        string='Course',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True,
+    )
+
+    period_start = fields.Date(
+        string='Month',
+        required=True,
+        readonly=True,
+        index=True,
+    )
+
+    type = fields.Selection(
+        TRANSACTION_TYPES,
+        string='Transaction Type',
+        required=True,
+        readonly=True,
+    )
+
+    amount = fields.Float(
+        string='Amount',
+        readonly=True,
+    )
+
+    transaction_count = fields.Integer(
+        string='Transactions',
+        readonly=True,
+    )
+
+    _sql_constraints = [
+        ('unique_course_period',
+         'UNIQUE(course_id, period_start, type)',
+         'A course can only have one summary per month and type')
+    ]
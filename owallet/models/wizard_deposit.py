@@ -46,7 +46,9 @@ class CreateDepositWizard(models.TransientModel):
         transaction = self.env['owallet.transaction'].create_deposit_transaction(
             user=self.user_id,
             amount=self.amount,
-            description=self.description
+            description=self.description,
+            # Resubmitting the same wizard must not deposit twice
+            idempotency_key=f'deposit-wizard-{self.id}',
         )
 
         return {
@@ -0,0 +1,110 @@
+import logging
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.tests.common import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+TRANSACTION_COUNT = 5000000
+USER_COUNT = 500
+COURSE_COUNT = 100
+
+# Expenditures of one teacher's courses within a month, as read by Bonus._get_expenditure_totals
+BONUS_QUERY = """
+    SELECT c.teacher_id, SUM(t.amount)
+      FROM owallet_transaction t
+      JOIN olearn2_course c ON c.id = t.course_id
+     WHERE t.type = 'expenditure'
+       AND t.date >= %s AND t.date < %s
+       AND c.active
+       AND c.teacher_id IN %s
+  GROUP BY c.teacher_id
+"""
+
+# First page of one owner's statement, as listed by "My Transactions"
+STATEMENT_QUERY = """
+    SELECT id
+      FROM owallet_transaction
+     WHERE owner_id = %s
+  ORDER BY date DESC
+     LIMIT 80
+"""
+
+
+# Opt-in: odoo-bin --test-tags owallet_benchmark
+@tagged('post_install', '-at_install', '-standard', 'owallet_benchmark')
+class BenchmarkTransactionIndexes(TransactionCase):
+    """Plans and timings of the bonus and statement queries over synthetic
+    transactions, with the reporting indexes and with them dropped."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        users = cls.env['res.users'].with_context(no_reset_password=True)
+        # res.users.create takes one record at a time here, each one gets its wallet
+        cls.users = users.browse([users.create({
+            'name': f'Benchmark User {index}',
+            'login': f'owallet_benchmark_{index}',
+        }).id for index in range(USER_COUNT)])
+        cls.teachers = cls.users[:COURSE_COUNT // 5]
+        cls.courses = cls.env['olearn2.course'].create([{
+            'name': f'Benchmark Course {index}',
+            'teacher_id': cls.teachers[index % len(cls.teachers)].id,
+            'cost': 10,
+        } for index in range(COURSE_COUNT)])
+
+        cls.env['owallet.transaction'].flush()
+        cls.env.cr.execute("""
+            INSERT INTO owallet_transaction
+                   (balance_id, owner_id, amount, currency_id, type, source, course_id, description, date)
+            SELECT b.id, b.owner_id, 10, %(currency_id)s,
+                   (ARRAY['deposit', 'expenditure', 'withdraw', 'bonus'])[1 + g %% 4],
+                   'automatic',
+                   CASE WHEN g %% 4 = 1 THEN (%(course_ids)s::int[])[1 + g %% %(course_count)s] END,
+                   'Benchmark',
+                   (now() at time zone 'UTC') - (g %% 730) * interval '1 day' - (g %% 86400) * interval '1 second'
+              FROM generate_series(1, %(count)s) g
+              JOIN (SELECT id, owner_id, row_number() OVER (ORDER BY id) - 1 AS n
+                      FROM owallet_balance
+                     WHERE owner_id IN %(user_ids)s) b
+                ON b.n = g %% %(user_count)s
+        """, {
+            'currency_id': cls.env.company.currency_id.id,
+            'course_ids': cls.courses.ids,
+            'course_count': COURSE_COUNT,
+            'count': TRANSACTION_COUNT,
+            'user_ids': tuple(cls.users.ids),
+            'user_count': USER_COUNT,
+        })
+        cls.env.cr.execute("ANALYZE owallet_transaction")
+
+    def _explain(self, query, params):
+        self.env.cr.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        return '\n'.join(row[0] for row in self.env.cr.fetchall())
+
+    def _explain_all(self):
+        month_start = self.env.cr.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        previous_month_start = month_start - relativedelta(months=1)
+        return {
+            'bonus': self._explain(BONUS_QUERY, (previous_month_start, month_start, tuple(self.teachers[:1].ids))),
+            'statement': self._explain(STATEMENT_QUERY, (self.users[-1].id,)),
+        }
+
+    def test_benchmark_reporting_indexes(self):
+        indexes = {
+            'bonus': 'owallet_transaction_course_type_date_index',
+            'statement': 'owallet_transaction_owner_date_index',
+        }
+
+        after = self._explain_all()
+        # Dropped inside the test transaction, the rollback restores them
+        for index in indexes.values():
+            self.env.cr.execute(f"DROP INDEX {index}")
+        before = self._explain_all()
+
+        for name, index in indexes.items():
+            _logger.info("%s query over %s transactions, without %s:\n%s", name, TRANSACTION_COUNT, index, before[name])
+            _logger.info("%s query over %s transactions, with %s:\n%s", name, TRANSACTION_COUNT, index, after[name])
+            self.assertIn(index, after[name])
+            self.assertNotIn(index, before[name])